@@ -1,18 +1,85 @@
-import os
 import json
 import csv
 import io
+import time
+from collections import deque
+from datetime import datetime
 import gradio as gr
-from scraper import scrape_comments
-from classifier import classify_comments
+from scraper import ScrapeLimits, Transport, parse_youtube_url, sanitize_title, scrape_comments
+from async_scraper import scrape_channel
+from cache import ResponseCache
+from classifier import DEFAULT_POLARITY_CACHE_PATH, POLARITY_ENGINES, PolarityCache, classify_comments
+from state import CheckpointStore
+from errors import YouTubeAPIError
+from keypool import KeyPool
+from monitor import CommentMonitor
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Shared by every request so re-running a URL is served from the on-disk cache
+TRANSPORT = Transport(cache=ResponseCache())
+# Quota counters persist across restarts; None until a key is configured
+KEY_POOL = KeyPool.from_env()
+# Sentiment scores for repeated comment texts, kept across restarts
+POLARITY_CACHE = PolarityCache(path=DEFAULT_POLARITY_CACHE_PATH)
+
+# Channel/playlist crawls run inside one request, so they are capped by default
+DEFAULT_CHANNEL_MAX_VIDEOS = 25
+DEFAULT_CHANNEL_QUOTA_BUDGET = 1000
+
+API_ERROR_MESSAGES = {
+    "commentsDisabled": "Comments are disabled for this video",
+    "quotaExceeded": "YouTube API daily quota exceeded, try again tomorrow",
+    "dailyLimitExceeded": "YouTube API daily quota exceeded, try again tomorrow",
+    "forbidden": "Access to this video's comments is forbidden",
+    "videoNotFound": "Video not found",
+}
+
+def scrape_channel_comments(api_key, youtube_url, search_terms=None, limits=None,
+                            max_videos=DEFAULT_CHANNEL_MAX_VIDEOS, quota_budget=DEFAULT_CHANNEL_QUOTA_BUDGET):
+    """
+    Scrape the videos behind a channel, handle or playlist URL concurrently
+    and merge the comments, tagging each with its video id and title.
+    At most `max_videos` are started and no new video once the crawl has
+    used `quota_budget` API units; `limits` apply to each video.
+    Returns (comments, number of videos scraped, number that failed).
+    """
+    comments = []
+    failed = 0
+    results = scrape_channel(
+        api_key,
+        youtube_url,
+        cache=TRANSPORT.cache,
+        checkpoints=CheckpointStore(),
+        search_terms=search_terms,
+        limits=limits,
+        max_videos=max_videos,
+        quota_budget=quota_budget
+    )
+    for video_id, result in results:
+        if isinstance(result, Exception):
+            failed += 1
+            continue
+        video_title, video_comments = result
+        for comment in video_comments:
+            comments.append({"video_id": video_id, "video_title": video_title, **comment})
+    return comments, len(results), failed
+
 def process_youtube_video(
     youtube_url: str,
     enable_classification: bool,
-    output_format: str
+    output_format: str,
+    expand_replies: bool = False,
+    max_comments: float = 0,
+    published_after: str = "",
+    published_before: str = "",
+    deadline: float = 0,
+    quick_sample: bool = False,
+    search_terms: str = "",
+    max_videos: float = DEFAULT_CHANNEL_MAX_VIDEOS,
+    quota_budget: float = DEFAULT_CHANNEL_QUOTA_BUDGET,
+    sentiment_engine: str = "textblob"
 ):
     """
     Main processing function that:
@@ -25,16 +92,68 @@ def process_youtube_video(
         if not youtube_url or not youtube_url.strip():
             return None, None, "Error: Please provide a valid YouTube URL"
         
-        # Get API key from environment
-        api_key = os.getenv("YOUTUBE_API_KEY")
+        # Get API keys from environment (YOUTUBE_API_KEYS may list several)
+        api_key = KEY_POOL
         if not api_key:
             return None, None, "Error: YOUTUBE_API_KEY environment variable not set"
         
-        # Step 1: Scrape comments
+        # Optional early-termination limits (0 / blank means no limit)
+        for value in (published_after, published_before):
+            if value and value.strip():
+                try:
+                    datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+                except ValueError:
+                    return None, None, f"Error: Invalid date '{value}', expected YYYY-MM-DD"
+        limits = ScrapeLimits(
+            max_comments=int(max_comments) if max_comments else None,
+            published_after=published_after or None,
+            published_before=published_before or None,
+            deadline=float(deadline) if deadline else None
+        )
+        
+        search_terms = search_terms.strip() if search_terms else None
+        
+        # Step 1: Scrape comments (a whole channel/playlist, or one video)
+        scrape_note = ""
         try:
-            title, comments = scrape_comments(api_key, youtube_url.strip())
+            kind, value = parse_youtube_url(youtube_url.strip())
+            if kind == "video":
+                title, comments = scrape_comments(
+                    api_key,
+                    youtube_url.strip(),
+                    transport=TRANSPORT,
+                    checkpoints=CheckpointStore(),
+                    expand_replies=expand_replies,
+                    limits=limits,
+                    sample_pages=1 if quick_sample else None,
+                    search_terms=search_terms
+                )
+                if quick_sample:
+                    scrape_note = " Quick sample: top comments only."
+                elif limits.partial:
+                    scrape_note = " Deadline reached: results are partial."
+            else:
+                if expand_replies or quick_sample:
+                    return None, None, "Error: Expand replies and quick sample only work for single video URLs"
+                title = sanitize_title(value)
+                comments, scraped, failed = scrape_channel_comments(
+                    api_key,
+                    youtube_url.strip(),
+                    search_terms,
+                    limits=limits,
+                    max_videos=int(max_videos) if max_videos else None,
+                    quota_budget=int(quota_budget) if quota_budget else None
+                )
+                scrape_note = f" Scraped {scraped} videos."
+                if failed:
+                    scrape_note += f" {failed} videos could not be scraped."
+                if limits.partial:
+                    scrape_note += " Deadline reached: results are partial."
         except ValueError as e:
             return None, None, f"Error: Invalid YouTube URL - {str(e)}"
+        except YouTubeAPIError as e:
+            message = API_ERROR_MESSAGES.get(e.reason, str(e))
+            return None, None, f"Error: {message} (reason: {e.reason or e.status})"
         except Exception as e:
             return None, None, f"Error scraping comments: {str(e)}"
         
@@ -45,7 +164,8 @@ def process_youtube_video(
         if enable_classification:
             try:
                 # Pass JSON (list of dicts) to classifier
-                classified_df = classify_comments(comments)
+                classified_df = classify_comments(comments, cache=POLARITY_CACHE, engine=sentiment_engine)
+                POLARITY_CACHE.save()
                 # Convert back to list of dicts with label field
                 results = classified_df.to_dict('records')
                 # Normalize category names to match spec
@@ -66,10 +186,12 @@ def process_youtube_video(
         else:
             results = comments
         
+        quota_note = f"Remaining API quota: {api_key.total_remaining()} units.{scrape_note}"
+        
         # Step 3: Format output
         if output_format == "JSON":
             json_output = json.dumps(results, indent=2)
-            return json_output, None, f"Success: Scraped {len(results)} comments from '{title}'"
+            return json_output, None, f"Success: Scraped {len(results)} comments from '{title}'. {quota_note}"
         
         elif output_format == "CSV":
             # Convert to CSV
@@ -78,7 +200,11 @@ def process_youtube_video(
                 fieldnames = list(results[0].keys())
                 writer = csv.DictWriter(output, fieldnames=fieldnames)
                 writer.writeheader()
-                writer.writerows(results)
+                for row in results:
+                    # Nested reply lists are stored as JSON text in one cell
+                    if isinstance(row.get('replies'), list):
+                        row = {**row, 'replies': json.dumps(row['replies'])}
+                    writer.writerow(row)
             
             csv_content = output.getvalue()
             
@@ -87,7 +213,7 @@ def process_youtube_video(
             with open(filename, 'w', encoding='utf-8') as f:
                 f.write(csv_content)
             
-            return None, filename, f"Success: Scraped {len(results)} comments from '{title}'. CSV ready for download."
+            return None, filename, f"Success: Scraped {len(results)} comments from '{title}'. CSV ready for download. {quota_note}"
         
         else:
             return None, None, "Error: Invalid output format selected"
@@ -95,6 +221,41 @@ def process_youtube_video(
     except Exception as e:
         return None, None, f"Unexpected error: {str(e)}"
 
+def monitor_youtube_video(youtube_url: str):
+    """
+    Live view: polls the video's newest comments and streams the most recent
+    ones to the UI until the user presses Stop.
+    """
+    if not youtube_url or not youtube_url.strip():
+        yield None, "Error: Please provide a valid YouTube URL"
+        return
+    if not KEY_POOL:
+        yield None, "Error: YOUTUBE_API_KEY environment variable not set"
+        return
+    
+    try:
+        # No response cache here: every poll must see the live head of the list
+        monitor = CommentMonitor(KEY_POOL, youtube_url.strip())
+    except ValueError as e:
+        yield None, f"Error: Invalid YouTube URL - {str(e)}"
+        return
+    
+    latest = deque(maxlen=200)
+    while True:
+        try:
+            new_comments = monitor.poll()
+        except YouTubeAPIError as e:
+            message = API_ERROR_MESSAGES.get(e.reason, str(e))
+            yield list(latest), f"Error: {message} (reason: {e.reason or e.status})"
+            return
+        for comment in new_comments:
+            latest.appendleft(comment)
+        yield list(latest), (
+            f"{len(new_comments)} new comments ({monitor.total_emitted} since start). "
+            f"Next check in {monitor.interval:.0f}s."
+        )
+        time.sleep(monitor.interval)
+
 def create_ui():
     """
     Create Gradio UI with required components
@@ -106,16 +267,70 @@ def create_ui():
         with gr.Row():
             with gr.Column():
                 url_input = gr.Textbox(
-                    label="YouTube Video URL",
+                    label="YouTube Video, Channel or Playlist URL",
                     placeholder="https://www.youtube.com/watch?v=...",
                     lines=1
                 )
                 
+                search_input = gr.Textbox(
+                    label="Search terms (optional)",
+                    placeholder="Only fetch comments mentioning these words",
+                    lines=1
+                )
+                
                 classify_checkbox = gr.Checkbox(
                     label="Enable classification",
                     value=False,
                     info="Classify comments into: Question, Criticism, Affirmation, Other"
                 )
+
+                engine_dropdown = gr.Dropdown(
+                    choices=list(POLARITY_ENGINES),
+                    label="Sentiment engine",
+                    value="textblob",
+                    info="Fallback for comments no keyword rule matches; fast is approximate"
+                )
+                
+                sample_checkbox = gr.Checkbox(
+                    label="Quick sample",
+                    value=False,
+                    info="Fetch only the first page of top comments for a fast preview"
+                )
+                
+                replies_checkbox = gr.Checkbox(
+                    label="Expand replies",
+                    value=False,
+                    info="Fetch every reply for each comment thread"
+                )
+                
+                with gr.Accordion("Limits", open=False):
+                    max_comments_input = gr.Number(
+                        label="Max comments (0 = all)",
+                        value=0,
+                        precision=0
+                    )
+                    published_after_input = gr.Textbox(
+                        label="Published after (YYYY-MM-DD)",
+                        placeholder="e.g. 2024-01-01"
+                    )
+                    published_before_input = gr.Textbox(
+                        label="Published before (YYYY-MM-DD)",
+                        placeholder="e.g. 2024-02-01"
+                    )
+                    deadline_input = gr.Number(
+                        label="Time limit in seconds (0 = none)",
+                        value=0
+                    )
+                    max_videos_input = gr.Number(
+                        label="Max videos for channel/playlist URLs (0 = all)",
+                        value=DEFAULT_CHANNEL_MAX_VIDEOS,
+                        precision=0
+                    )
+                    quota_budget_input = gr.Number(
+                        label="Quota budget for channel/playlist URLs (0 = none)",
+                        value=DEFAULT_CHANNEL_QUOTA_BUDGET,
+                        precision=0
+                    )
                 
                 format_dropdown = gr.Dropdown(
                     choices=["JSON", "CSV"],
@@ -146,10 +361,54 @@ def create_ui():
         # Wire up the button
         run_button.click(
             fn=process_youtube_video,
-            inputs=[url_input, classify_checkbox, format_dropdown],
+            inputs=[
+                url_input,
+                classify_checkbox,
+                format_dropdown,
+                replies_checkbox,
+                max_comments_input,
+                published_after_input,
+                published_before_input,
+                deadline_input,
+                sample_checkbox,
+                search_input,
+                max_videos_input,
+                quota_budget_input,
+                engine_dropdown
+            ],
             outputs=[json_output, file_output, status_output]
         )
     
+        gr.Markdown("## Live comment monitor")
+        gr.Markdown("Watch a video for new comments as they are posted.")
+        
+        with gr.Row():
+            with gr.Column():
+                monitor_url_input = gr.Textbox(
+                    label="YouTube Video URL",
+                    placeholder="https://www.youtube.com/watch?v=...",
+                    lines=1
+                )
+                
+                with gr.Row():
+                    monitor_start_button = gr.Button("Start monitoring", variant="primary")
+                    monitor_stop_button = gr.Button("Stop")
+                
+                monitor_output = gr.JSON(label="Newest comments")
+                
+                monitor_status = gr.Textbox(
+                    label="Monitor status",
+                    lines=2,
+                    interactive=False
+                )
+        
+        monitor_event = monitor_start_button.click(
+            fn=monitor_youtube_video,
+            inputs=[monitor_url_input],
+            outputs=[monitor_output, monitor_status]
+        )
+        monitor_stop_button.click(fn=None, cancels=[monitor_event])
+    
     return app
 
 if __name__ == "__main__":
@@ -0,0 +1,369 @@
+import asyncio
+from collections import namedtuple
+
+import aiohttp
+
+import fastjson
+from errors import NotFoundError, QuotaExceededError, YouTubeAPIError, api_error_from_response
+from keypool import KeyPool, endpoint_cost
+from ratelimit import backoff_delay, default_limiter, retry_after_seconds
+from scraper import (
+    API_BASE_URL,
+    DEFAULT_COLUMNS,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_TIMEOUT,
+    channel_params,
+    checkpoint_config,
+    comment_thread_params,
+    extract_video_id,
+    flatten_comment_thread,
+    metadata_cache,
+    parse_youtube_url,
+    playlist_items_params,
+    sanitize_title,
+    split_cached_metadata,
+    uploads_playlist_id,
+    video_metadata,
+    video_url,
+    videos_params,
+)
+
+DEFAULT_CONCURRENCY = 8
+
+AsyncResponse = namedtuple("AsyncResponse", ["status", "headers", "body", "from_cache"], defaults=(False,))
+
+class AsyncTransport:
+    """aiohttp counterpart of scraper.Transport: one pooled session, one
+    rate limiter and optionally one response cache shared by all crawls."""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, limiter=None, cache=None,
+                 base_url=None):
+        self.base_url = (base_url or API_BASE_URL).rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.limiter = limiter or default_limiter
+        self.cache = cache
+        self.quota_used = 0
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, limit_per_host=self.pool_size)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"Accept-Encoding": "gzip, deflate"},
+            )
+        return self._session
+
+    def endpoint(self, name):
+        return f"{self.base_url}/{name}"
+
+    async def get(self, url, params=None):
+        params = {k: str(v) for k, v in (params or {}).items()}
+        # Every cache call reads or commits to SQLite, so all of them run off the event loop.
+        entry = await asyncio.to_thread(self.cache.lookup, url, params) if self.cache is not None else None
+        if entry is not None and entry.fresh:
+            return AsyncResponse(200, {"ETag": entry.etag} if entry.etag else {}, entry.body, True)
+
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else None
+        await self.limiter.acquire_async()
+        async with self._get_session().get(url, params=params, headers=headers) as resp:
+            response = AsyncResponse(resp.status, resp.headers, await resp.read())
+        if self.cache is None:
+            return response
+        if response.status == 304 and entry is not None:
+            await asyncio.to_thread(self.cache.refresh, url, params)
+            # A revalidation is a real API call, so it is charged like one.
+            return AsyncResponse(200, response.headers, entry.body, from_cache=False)
+        if response.status == 200:
+            await asyncio.to_thread(self.cache.store, url, params, response.body, response.headers.get("ETag"))
+        return response
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+async def exponential_backoff_request_async(url, params, transport, max_retries=6, backoff_base=1.5):
+    pool = params.get("key") if isinstance(params.get("key"), KeyPool) else None
+    attempt = 0
+    error = None
+    while attempt < max_retries:
+        request_params = params
+        if pool is not None:
+            key = pool.current_key()
+            request_params = {**params, "key": key}
+        resp = await transport.get(url, params=request_params)
+        if not resp.from_cache:
+            transport.quota_used += endpoint_cost(url)
+            if pool is not None:
+                pool.record(key, url)
+        if resp.status == 200:
+            return resp
+        error = api_error_from_response(resp.status, resp.body)
+        if pool is not None and isinstance(error, QuotaExceededError):
+            pool.mark_exhausted(key)
+            continue
+        if not error.retryable:
+            raise error
+        await asyncio.sleep(backoff_delay(attempt, backoff_base, retry_after_seconds(resp.headers)))
+        attempt += 1
+    if error is None:
+        raise ValueError(f"max_retries must be at least 1, got {max_retries}")
+    # Out of retries: surface the last typed error so callers can report its reason.
+    raise error
+
+def _decode(resp):
+    return fastjson.loads(resp.body)
+
+async def get_videos_metadata_async(api_key, video_ids, transport, cache=None):
+    cache = metadata_cache if cache is None else cache
+    url = transport.endpoint("videos")
+    result, chunks = split_cached_metadata(video_ids, cache)
+    for chunk in chunks:
+        response = await exponential_backoff_request_async(url, videos_params(api_key, chunk), transport)
+        for item in _decode(response).get("items", []):
+            metadata = video_metadata(item)
+            cache.set(metadata["video_id"], metadata)
+            result[metadata["video_id"]] = metadata
+    return result
+
+async def get_video_title_async(api_key, video_id, transport):
+    metadata = (await get_videos_metadata_async(api_key, [video_id], transport)).get(video_id)
+    if metadata is None:
+        raise NotFoundError(404, "videoNotFound", f"no video with id {video_id}")
+    return sanitize_title(metadata["title"])
+
+async def iter_comment_thread_pages_async(api_key, video_id, transport, page_token=None, columns=DEFAULT_COLUMNS,
+                                          search_terms=None):
+    endpoint = transport.endpoint("commentThreads")
+    params = comment_thread_params(api_key, video_id, columns=columns, search_terms=search_terms)
+    next_token = page_token
+
+    while True:
+        if next_token:
+            params["pageToken"] = next_token
+        else:
+            params.pop("pageToken", None)
+
+        response = await exponential_backoff_request_async(endpoint, params, transport)
+        data = _decode(response)
+        yield data
+
+        next_token = data.get("nextPageToken")
+        if not next_token:
+            break
+
+async def fetch_all_comment_threads_async(api_key, video_id, transport):
+    comments = []
+    async for page in iter_comment_thread_pages_async(api_key, video_id, transport):
+        comments.extend(page.get("items", []))
+    return comments
+
+async def iter_comment_pages_async(api_key, video_id, transport, checkpoints=None, columns=DEFAULT_COLUMNS,
+                                   limits=None, search_terms=None):
+    page_token = None
+    config = checkpoint_config(columns, limits=limits)
+    if checkpoints is not None:
+        saved_pages, page_token = await asyncio.to_thread(checkpoints.load, video_id, config)
+        for comments in saved_pages:
+            stop = False
+            if limits is not None:
+                comments, stop = limits.trim_rows(comments)
+            yield comments
+            if stop:
+                return
+        if saved_pages and not page_token:
+            return
+
+    async for page in iter_comment_thread_pages_async(api_key, video_id, transport, page_token=page_token,
+                                                      columns=columns, search_terms=search_terms):
+        stop = False
+        if limits is not None:
+            page, stop = limits.trim(page)
+        comments = [flatten_comment_thread(item, columns) for item in page.get("items", [])]
+        if checkpoints is not None:
+            # append fsyncs; keep that off the loop so concurrent crawls don't stall on it.
+            await asyncio.to_thread(checkpoints.append, video_id, comments, page.get("nextPageToken"), config)
+        yield comments
+        if stop:
+            return
+
+async def iter_comments_async(api_key, video_id, transport, checkpoints=None, columns=DEFAULT_COLUMNS,
+                              limits=None, search_terms=None):
+    async for page in iter_comment_pages_async(api_key, video_id, transport, checkpoints=checkpoints,
+                                               columns=columns, limits=limits, search_terms=search_terms):
+        for comment in page:
+            yield comment
+
+async def scrape_comments_async(api_key, video_url, transport=None, checkpoints=None, columns=DEFAULT_COLUMNS,
+                                limits=None, search_terms=None):
+    if transport is None:
+        async with AsyncTransport() as transport:
+            return await scrape_comments_async(api_key, video_url, transport, checkpoints, columns, limits,
+                                               search_terms)
+    if search_terms:
+        checkpoints = None
+    video_id = extract_video_id(video_url)
+    title_task = asyncio.ensure_future(get_video_title_async(api_key, video_id, transport))
+    try:
+        flat_comments = [c async for c in iter_comments_async(api_key, video_id, transport, checkpoints, columns, limits,
+                                                              search_terms)]
+    except BaseException:
+        title_task.cancel()
+        raise
+    title = await title_task
+    if checkpoints is not None and not (limits is not None and limits.partial):
+        await asyncio.to_thread(checkpoints.clear, video_id)
+    return title, flat_comments
+
+async def scrape_many_async(api_key, video_urls, concurrency=DEFAULT_CONCURRENCY, transport=None, checkpoints=None,
+                            columns=DEFAULT_COLUMNS, search_terms=None):
+    """Scrape several videos concurrently.
+
+    Returns a list aligned with `video_urls`; each entry is either a
+    `(title, comments)` tuple or the exception raised for that video.
+    """
+    if transport is None:
+        async with AsyncTransport(pool_size=max(concurrency, DEFAULT_POOL_SIZE)) as transport:
+            return await scrape_many_async(api_key, video_urls, concurrency, transport, checkpoints, columns,
+                                           search_terms)
+    # One batched videos.list pass warms the metadata cache for every title lookup.
+    video_ids = []
+    for url in video_urls:
+        try:
+            video_ids.append(extract_video_id(url))
+        except ValueError:
+            pass
+    try:
+        await get_videos_metadata_async(api_key, video_ids, transport)
+    except YouTubeAPIError:
+        # Each video's own title lookup will surface the error.
+        pass
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def scrape_one(url):
+        async with semaphore:
+            return await scrape_comments_async(api_key, url, transport, checkpoints, columns,
+                                               search_terms=search_terms)
+
+    return await asyncio.gather(*(scrape_one(url) for url in video_urls), return_exceptions=True)
+
+def scrape_many(api_key, video_urls, concurrency=DEFAULT_CONCURRENCY, checkpoints=None, columns=DEFAULT_COLUMNS,
+                search_terms=None):
+    return asyncio.run(scrape_many_async(api_key, video_urls, concurrency, checkpoints=checkpoints, columns=columns,
+                                         search_terms=search_terms))
+
+async def resolve_uploads_playlist_async(api_key, kind, value, transport):
+    url = transport.endpoint("channels")
+    response = await exponential_backoff_request_async(url, channel_params(api_key, kind, value), transport)
+    return uploads_playlist_id(_decode(response), value)
+
+async def iter_playlist_video_id_pages_async(api_key, playlist_id, transport):
+    url = transport.endpoint("playlistItems")
+    params = playlist_items_params(api_key, playlist_id)
+    while True:
+        response = await exponential_backoff_request_async(url, params, transport)
+        data = _decode(response)
+        yield [item["contentDetails"]["videoId"] for item in data.get("items", [])]
+
+        next_token = data.get("nextPageToken")
+        if not next_token:
+            break
+        params["pageToken"] = next_token
+
+async def iter_video_id_pages_async(api_key, youtube_url, transport):
+    kind, value = parse_youtube_url(youtube_url)
+    if kind == "video":
+        yield [value]
+        return
+    if kind == "playlist":
+        playlist_id = value
+    else:
+        playlist_id = await resolve_uploads_playlist_async(api_key, kind, value, transport)
+    async for page in iter_playlist_video_id_pages_async(api_key, playlist_id, transport):
+        yield page
+
+async def scrape_channel_async(api_key, youtube_url, concurrency=DEFAULT_CONCURRENCY, transport=None,
+                               quota_budget=None, max_videos=None, checkpoints=None, columns=DEFAULT_COLUMNS,
+                               search_terms=None, limits=None):
+    """Scrape every video of a channel, @handle or playlist URL concurrently.
+
+    Yields `(video_id, result)` as each video finishes, where result is a
+    `(title, comments)` tuple or the exception raised for that video. No new
+    video is started once `transport.quota_used` reaches `quota_budget` units
+    or `max_videos` have been started; videos already running are finished.
+    `limits` applies per video (see `ScrapeLimits.copy`), except that its
+    deadline covers the whole crawl; `limits.partial` is set if it cut the
+    crawl short.
+    """
+    if transport is None:
+        async with AsyncTransport(pool_size=max(concurrency, DEFAULT_POOL_SIZE)) as transport:
+            async for item in scrape_channel_async(api_key, youtube_url, concurrency, transport, quota_budget,
+                                                   max_videos, checkpoints, columns, search_terms, limits):
+                yield item
+        return
+
+    async def scrape_one(video_id):
+        video_limits = limits.copy() if limits is not None else None
+        try:
+            return video_id, await scrape_comments_async(api_key, video_url(video_id), transport, checkpoints, columns,
+                                                         limits=video_limits, search_terms=search_terms)
+        except Exception as e:
+            return video_id, e
+        finally:
+            if video_limits is not None and video_limits.partial:
+                limits.partial = True
+
+    def budget_left(started):
+        if max_videos is not None and started >= max_videos:
+            return False
+        if limits is not None and limits.expired:
+            limits.partial = True
+            return False
+        return quota_budget is None or transport.quota_used < quota_budget
+
+    pending = set()
+    started = 0
+    try:
+        async for video_ids in iter_video_id_pages_async(api_key, youtube_url, transport):
+            if not budget_left(started):
+                break
+            # Playlist pages hold 50 ids, exactly one batched videos.list call.
+            try:
+                await get_videos_metadata_async(api_key, video_ids, transport)
+            except YouTubeAPIError:
+                pass
+            for video_id in video_ids:
+                while len(pending) >= concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+                if not budget_left(started):
+                    break
+                pending.add(asyncio.ensure_future(scrape_one(video_id)))
+                started += 1
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+def scrape_channel(api_key, youtube_url, concurrency=DEFAULT_CONCURRENCY, cache=None, **kwargs):
+    """Blocking wrapper around `scrape_channel_async`; returns a list of
+    `(video_id, result)` pairs in completion order."""
+    async def collect():
+        async with AsyncTransport(pool_size=max(concurrency, DEFAULT_POOL_SIZE), cache=cache) as transport:
+            return [item async for item in scrape_channel_async(api_key, youtube_url, concurrency, transport, **kwargs)]
+    return asyncio.run(collect())
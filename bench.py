@@ -0,0 +1,223 @@
+"""End-to-end benchmark of scrape_comments against the local mock API.
+
+Each scenario (video size x page latency x error rate) starts a fresh
+MockYouTubeAPI in this process and runs the scraper in a separate spawned
+process, so peak RSS reflects the scraper alone. Results are written as JSON;
+pass `--compare` with an earlier file to flag throughput regressions.
+
+    python bench.py --sizes 1000,100000 --latencies 0,0.05 --error-rates 0,0.01
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import platform
+import queue as queue_module
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import fastjson
+from mock_api import MockYouTubeAPI
+from ratelimit import TokenBucket
+from scraper import Transport, iter_comments, scrape_comments, video_url
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+DEFAULT_LATENCIES = (0.0, 0.05)
+DEFAULT_ERROR_RATES = (0.0, 0.01)
+# High enough that the limiter never throttles; the mock is the bottleneck.
+DEFAULT_RATE = 10000
+REGRESSION_THRESHOLD = 0.9
+DEFAULT_SCENARIO_TIMEOUT = 3600
+METRICS = ("seconds", "comments", "pages", "requests", "retries", "pages_per_sec", "comments_per_sec",
+           "p50_page_latency_ms", "p99_page_latency_ms", "bytes_received", "peak_rss_mb")
+
+class InstrumentedTransport(Transport):
+    """Transport that records request counts, page latencies and wire bytes.
+
+    A page's latency runs from its first commentThreads attempt to the one
+    that succeeds, so failed attempts and backoff sleeps are included.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requests = 0
+        self.retries = 0
+        self.bytes_received = 0
+        self.page_latencies = []
+        self._page_started = None
+
+    def get(self, url, params=None):
+        is_page = url.endswith("/commentThreads")
+        if is_page and self._page_started is None:
+            self._page_started = time.perf_counter()
+        resp = super().get(url, params)
+        self.requests += 1
+        # Content-Length is the compressed size actually sent over the wire.
+        self.bytes_received += int(resp.headers.get("Content-Length") or len(resp.content))
+        if resp.status_code != 200:
+            self.retries += 1
+        elif is_page:
+            self.page_latencies.append(time.perf_counter() - self._page_started)
+            self._page_started = None
+        return resp
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _scenario_worker(base_url, video_id, rate, stream, expand_replies, queue):
+    transport = InstrumentedTransport(base_url=base_url, limiter=TokenBucket(rate, rate))
+    start = time.perf_counter()
+    try:
+        if stream:
+            comments = sum(1 for _ in iter_comments("bench-key", video_id, transport=transport,
+                                                    expand_replies=expand_replies))
+        else:
+            _, result = scrape_comments("bench-key", video_url(video_id), transport=transport,
+                                        expand_replies=expand_replies)
+            comments = len(result)
+        error = None
+    except Exception as e:
+        comments = 0
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    pages = len(transport.page_latencies)
+    queue.put({
+        "error": error,
+        "seconds": round(elapsed, 3),
+        "comments": comments,
+        "pages": pages,
+        "requests": transport.requests,
+        "retries": transport.retries,
+        "pages_per_sec": round(pages / elapsed, 2) if elapsed else None,
+        "comments_per_sec": round(comments / elapsed, 1) if elapsed else None,
+        "p50_page_latency_ms": _round_ms(_percentile(transport.page_latencies, 50)),
+        "p99_page_latency_ms": _round_ms(_percentile(transport.page_latencies, 99)),
+        "bytes_received": transport.bytes_received,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    })
+
+def _round_ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+def _wait_for_metrics(worker, queue, timeout):
+    """Metrics from the worker, or an error entry if it dies or runs past `timeout`."""
+    deadline = time.monotonic() + timeout if timeout else None
+    while True:
+        try:
+            return queue.get(timeout=1)
+        except queue_module.Empty:
+            pass
+        if not worker.is_alive():
+            # The worker may have put its result just before exiting.
+            try:
+                return queue.get(timeout=1)
+            except queue_module.Empty:
+                return {"error": f"worker exited with code {worker.exitcode} before reporting"}
+        if deadline is not None and time.monotonic() >= deadline:
+            worker.terminate()
+            return {"error": f"timed out after {timeout} s"}
+
+def run_scenario(size, latency, error_rate, rate=DEFAULT_RATE, stream=False, expand_replies=False, seed=0,
+                 timeout=DEFAULT_SCENARIO_TIMEOUT):
+    video_id = f"bench{size}"
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    with MockYouTubeAPI(comments=size, latency=latency, error_rate=error_rate, seed=seed) as api:
+        worker = context.Process(target=_scenario_worker,
+                                 args=(api.base_url, video_id, rate, stream, expand_replies, queue))
+        worker.start()
+        metrics = {**dict.fromkeys(METRICS), **_wait_for_metrics(worker, queue, timeout)}
+        worker.join()
+        server_stats = dict(api.stats)
+    return {
+        "size": size,
+        "latency": latency,
+        "error_rate": error_rate,
+        "stream": stream,
+        "expand_replies": expand_replies,
+        **metrics,
+        "injected_errors": server_stats["errors"],
+    }
+
+def compare(results, baseline_path):
+    """Print throughput against an earlier run; returns the regressed scenarios."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    scenario_key = lambda r: (r["size"], r["latency"], r["error_rate"], r["stream"], r["expand_replies"])
+    previous = {scenario_key(r): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(scenario_key(result))
+        if not before or not before.get("comments_per_sec") or not result.get("comments_per_sec"):
+            continue
+        ratio = result["comments_per_sec"] / before["comments_per_sec"]
+        flag = "  REGRESSION" if ratio < REGRESSION_THRESHOLD else ""
+        print(f"  size={result['size']} latency={result['latency']} errors={result['error_rate']}: "
+              f"{ratio:.2f}x comments/sec{flag}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+def _floats(value):
+    return [float(v) for v in value.split(",") if v != ""]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comment threads per video")
+    parser.add_argument("--latencies", default=",".join(map(str, DEFAULT_LATENCIES)), help="seconds per page")
+    parser.add_argument("--error-rates", default=",".join(map(str, DEFAULT_ERROR_RATES)))
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="client token-bucket requests/sec")
+    parser.add_argument("--stream", action="store_true", help="consume iter_comments instead of building a list")
+    parser.add_argument("--expand-replies", action="store_true")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_SCENARIO_TIMEOUT,
+                        help="seconds before a scenario is abandoned")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = []
+    scenarios = itertools.product([int(s) for s in args.sizes.split(",") if s],
+                                  _floats(args.latencies), _floats(args.error_rates))
+    for size, latency, error_rate in scenarios:
+        result = run_scenario(size, latency, error_rate, args.rate, args.stream, args.expand_replies,
+                              timeout=args.timeout)
+        results.append(result)
+        print(f"size={size} latency={latency} errors={error_rate}: "
+              f"{result['pages_per_sec']} pages/s, {result['comments_per_sec']} comments/s, "
+              f"p50 {result['p50_page_latency_ms']} ms, p99 {result['p99_page_latency_ms']} ms, "
+              f"{result['retries']} retries, {result['peak_rss_mb']} MB peak"
+              + (f", error: {result['error']}" if result["error"] else ""))
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "json_decoder": fastjson.decoder_name(),
+            "client_rate": args.rate,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        print(f"Compared with {args.compare}:")
+        if compare(results, args.compare):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
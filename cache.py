@@ -0,0 +1,154 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from urllib.parse import urlencode
+
+from state import DEFAULT_STATE_DIR
+
+DEFAULT_RESPONSE_TTL = 600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Cache hits update accessed_at in batches of this many, not one commit per hit.
+TOUCH_BATCH_SIZE = 256
+# Params that identify the caller rather than the resource.
+UNCACHED_PARAMS = ("key",)
+
+CacheEntry = namedtuple("CacheEntry", ["body", "etag", "fresh"])
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+def cache_key(url, params):
+    items = sorted((k, str(v)) for k, v in (params or {}).items() if k not in UNCACHED_PARAMS)
+    return url + "?" + urlencode(items)
+
+class ResponseCache:
+    """On-disk SQLite cache of successful API responses.
+
+    Entries are keyed on endpoint + params (minus the API key), expire after
+    a per-entry TTL and are evicted least-recently-used once the stored bodies
+    exceed `max_bytes`. Expired entries keep their ETag so the transport can
+    revalidate them with If-None-Match instead of downloading again. Hits
+    only record their access time in memory; the LRU order is written back in
+    batches (and before any eviction), so lookups never commit.
+    """
+
+    def __init__(self, path=os.path.join(DEFAULT_STATE_DIR, "responses.sqlite"),
+                 ttl=DEFAULT_RESPONSE_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, etag TEXT, body BLOB, size INTEGER, "
+            "expires_at REAL, accessed_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    def lookup(self, url, params):
+        key = cache_key(url, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= TOUCH_BATCH_SIZE:
+                self._flush_touches()
+                self._conn.commit()
+        body, etag, expires_at = row
+        return CacheEntry(body, etag, expires_at > now)
+
+    def store(self, url, params, body, etag=None, ttl=None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, etag, body, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key(url, params), etag, body, len(body), expires_at, now),
+            )
+            self._flush_touches()
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, url, params, ttl=None):
+        """Mark an entry fresh again after a 304 Not Modified."""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET expires_at = ?, accessed_at = ? WHERE key = ?",
+                (expires_at, now, cache_key(url, params)),
+            )
+            self._conn.commit()
+
+    def _flush_touches(self):
+        if self._touched:
+            self._conn.executemany("UPDATE responses SET accessed_at = ? WHERE key = ?",
+                                   [(at, key) for key, at in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._flush_touches()
+            self._conn.commit()
+            self._conn.close()
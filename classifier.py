@@ -1,24 +1,181 @@
-from textblob import TextBlob
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
+from textblob import TextBlob
+
+from keywords import KeywordMatcher, normalize_text
+from polarity import get_scorer
+from state import DEFAULT_STATE_DIR, read_json, write_json_atomic
+
+DEFAULT_POLARITY_CACHE_SIZE = 100000
+DEFAULT_POLARITY_CACHE_PATH = os.path.join(DEFAULT_STATE_DIR, "polarity.json")
+# Sentiment fallback: TextBlob itself, the lexicon scorer's exact port of it,
+# or its vectorized approximation (see polarity.py).
+POLARITY_ENGINES = ('textblob', 'compat', 'fast')
+
+# Keyword vocabulary (criticism/affirmative words and negations) lives in
+# vocabulary.json; pass a different KeywordMatcher to use your own.
+keyword_matcher = KeywordMatcher.from_file()
+
+class PolarityCache:
+    """Bounded LRU of TextBlob polarity scores keyed on whitespace-collapsed text.
+
+    Comment sections repeat a lot ("first", "W", emoji runs), so most fallback
+    lookups are duplicates. Keys keep their case: TextBlob scores emoticons
+    such as ":D" differently once lowercased. With a `path`, entries are
+    loaded on creation and written back by `save()`.
+    """
+
+    def __init__(self, maxsize=DEFAULT_POLARITY_CACHE_SIZE, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+
+    @staticmethod
+    def key(text):
+        return " ".join(text.split())
+
+    def polarity(self, text):
+        key = self.key(text)
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+        value = TextBlob(key).sentiment.polarity
+        with self._lock:
+            self.misses += 1
+            self._data[key] = value
+            self._dirty = True
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def load(self):
+        entries = read_json(self.path, default=[])
+        with self._lock:
+            # Oldest first, so the most recently used survive the size cap.
+            for key, value in entries[-self.maxsize:]:
+                self._data[key] = value
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            entries = list(self._data.items())
+            self._dirty = False
+        write_json_atomic(self.path, entries)
 
-def classify_comment(comment):
-    text = comment.lower()
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+polarity_cache = PolarityCache()
+
+def polarity_label(polarity):
+    if polarity > 0.2:
+        return 'affirmative'
+    elif polarity < -0.2:
+        return 'criticism'
+    else:
+        return 'neutral'
+
+def polarity_labels(polarities):
+    return np.select([polarities > 0.2, polarities < -0.2], ['affirmative', 'criticism'], 'neutral')
+
+def polarity_category(comment, cache=None, engine='textblob'):
+    if engine == 'textblob':
+        return polarity_label((cache or polarity_cache).polarity(comment))
+    elif engine == 'compat':
+        return polarity_label(get_scorer().polarity(comment))
+    elif engine == 'fast':
+        return polarity_label(get_scorer().score_fast([comment])[0])
+    raise ValueError(f"unknown polarity engine {engine!r}, expected one of {POLARITY_ENGINES}")
+
+def classify_comment(comment, matcher=None, cache=None, engine='textblob'):
+    matcher = matcher or keyword_matcher
+    text = normalize_text(comment)
     if '?' in text:
         return 'question'
-    elif any(word in text for word in ['bad', 'worst', 'hate', 'not good', 'terrible', 'disagree']):
+    categories = matcher.categories(text, normalized=True)
+    if 'criticism' in categories:
         return 'criticism'
-    elif any(word in text for word in ['good', 'love', 'nice', 'amazing', 'agree', 'great', 'awesome']):
+    elif 'affirmative' in categories:
         return 'affirmative'
     else:
-        polarity = TextBlob(comment).sentiment.polarity
-        if polarity > 0.2:
-            return 'affirmative'
-        elif polarity < -0.2:
-            return 'criticism'
+        return polarity_category(comment, cache, engine)
+
+def keyword_mask(normalized, negated, matcher, category):
+    hits = np.zeros(len(normalized), dtype=bool)
+    # The negation-aware pattern is several times slower, so only texts that
+    # actually contain a negated keyword go through it.
+    hits[~negated] = normalized[~negated].str.contains(matcher.keyword_patterns[category]).to_numpy()
+    if negated.any():
+        hits[negated] = normalized[negated].str.contains(matcher.category_patterns[category]).to_numpy()
+    return hits
+
+def classify_texts(texts, matcher=None, cache=None, engine='textblob'):
+    """Vectorized classify_comment over a string Series; returns a category Series."""
+    if engine not in POLARITY_ENGINES:
+        raise ValueError(f"unknown polarity engine {engine!r}, expected one of {POLARITY_ENGINES}")
+    matcher = matcher or keyword_matcher
+    # On object columns the equivalent .str chain loops once per method and
+    # is ~3x slower than one normalize_text call per row.
+    normalized = texts.map(normalize_text)
+    if matcher.negated_pattern is not None:
+        negated = normalized.str.contains(matcher.negated_pattern).to_numpy()
+    else:
+        negated = np.zeros(len(texts), dtype=bool)
+    categories = np.full(len(texts), '', dtype=object)
+    unmatched = np.ones(len(texts), dtype=bool)
+    # Rules are checked in priority order, each only against rows no earlier
+    # rule claimed, so later masks scan a shrinking subset of the column.
+    for category in ('question', 'criticism', 'affirmative'):
+        if not unmatched.any():
+            break
+        subset = normalized[unmatched]
+        if category == 'question':
+            hits = subset.str.contains('?', regex=False).to_numpy()
+        else:
+            hits = keyword_mask(subset, negated[unmatched], matcher, category)
+        rows = np.flatnonzero(unmatched)[hits]
+        categories[rows] = category
+        unmatched[rows] = False
+    # Sentiment is the only per-row Python work left; run it only where no rule matched.
+    if unmatched.any():
+        remaining = texts[unmatched]
+        if engine == 'textblob':
+            categories[unmatched] = remaining.map(lambda text: polarity_category(text, cache)).to_numpy()
+        elif engine == 'compat':
+            categories[unmatched] = polarity_labels(get_scorer().score_compat(remaining))
         else:
-            return 'neutral'
+            categories[unmatched] = polarity_labels(get_scorer().score_fast(remaining))
+    return pd.Series(categories, index=texts.index)
 
-def classify_comments(comments):
+def classify_comments(comments, matcher=None, cache=None, engine='textblob'):
     df = pd.DataFrame(comments)
-    df["category"] = df["text"].astype(str).apply(classify_comment)
+    df["category"] = classify_texts(df["text"].astype(str), matcher, cache, engine)
     return df
+
+def iter_classified_pages(pages, engine='textblob'):
+    for page in pages:
+        if page:
+            yield classify_comments(page, engine=engine)
@@ -0,0 +1,79 @@
+import json
+
+RETRYABLE_REASONS = {
+    "rateLimitExceeded",
+    "userRateLimitExceeded",
+    "backendError",
+    "internalError",
+}
+
+class YouTubeAPIError(Exception):
+    """Error response from the YouTube Data API.
+
+    `reason` is the first `error.errors[].reason` from the response body,
+    e.g. "quotaExceeded" or "commentsDisabled", when the API supplied one.
+    """
+
+    def __init__(self, status, reason=None, message=None):
+        self.status = status
+        self.reason = reason
+        self.message = message
+        detail = f"YouTube API error {status}"
+        if reason:
+            detail += f" ({reason})"
+        if message:
+            detail += f": {message}"
+        super().__init__(detail)
+
+    @property
+    def retryable(self):
+        if self.reason in RETRYABLE_REASONS:
+            return True
+        return self.status == 429 or self.status >= 500
+
+class QuotaExceededError(YouTubeAPIError):
+    pass
+
+class CommentsDisabledError(YouTubeAPIError):
+    pass
+
+class ForbiddenError(YouTubeAPIError):
+    pass
+
+class NotFoundError(YouTubeAPIError):
+    pass
+
+_ERROR_TYPES = {
+    "quotaExceeded": QuotaExceededError,
+    "dailyLimitExceeded": QuotaExceededError,
+    "commentsDisabled": CommentsDisabledError,
+    "forbidden": ForbiddenError,
+    "insufficientPermissions": ForbiddenError,
+    "videoNotFound": NotFoundError,
+    "commentThreadNotFound": NotFoundError,
+    "commentNotFound": NotFoundError,
+    "channelNotFound": NotFoundError,
+    "playlistNotFound": NotFoundError,
+}
+
+def api_error_from_response(status, body):
+    """Build the typed exception for an error response body (bytes or str)."""
+    reason = None
+    message = None
+    try:
+        error = json.loads(body).get("error", {})
+    except (ValueError, AttributeError):
+        error = {}
+    if isinstance(error, dict):
+        message = error.get("message")
+        details = error.get("errors") or [{}]
+        reason = details[0].get("reason")
+    if reason in _ERROR_TYPES:
+        error_type = _ERROR_TYPES[reason]
+    elif status == 403 and reason not in RETRYABLE_REASONS:
+        error_type = ForbiddenError
+    elif status == 404:
+        error_type = NotFoundError
+    else:
+        error_type = YouTubeAPIError
+    return error_type(status, reason, message)
@@ -0,0 +1,35 @@
+"""Pluggable JSON decoding for API pages.
+
+Uses orjson or msgspec when installed and falls back to the stdlib.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+def _default_decoder():
+    if orjson is not None:
+        return orjson.loads
+    if msgspec is not None:
+        return msgspec.json.decode
+    return json.loads
+
+_decoder = _default_decoder()
+
+def set_decoder(decoder):
+    """Override the decoder (any callable taking bytes); None restores the default."""
+    global _decoder
+    _decoder = decoder or _default_decoder()
+
+def decoder_name():
+    return f"{_decoder.__module__}.{_decoder.__name__}"
+
+def loads(data):
+    return _decoder(data)
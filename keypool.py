@@ -0,0 +1,133 @@
+import atexit
+import hashlib
+import os
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except Exception:
+    QUOTA_TIMEZONE = None
+
+from errors import QuotaExceededError
+from state import DEFAULT_STATE_DIR, read_json, write_json_atomic
+
+DEFAULT_DAILY_QUOTA = 10000
+# Usage is written to disk once this many units accumulate, not per request.
+DEFAULT_SAVE_EVERY = 50
+# Quota units charged per call, by endpoint name.
+QUOTA_COSTS = {
+    "commentThreads": 1,
+    "comments": 1,
+    "videos": 1,
+    "channels": 1,
+    "playlistItems": 1,
+    "search": 100,
+}
+
+def endpoint_cost(url):
+    return QUOTA_COSTS.get(urlparse(url).path.rstrip("/").rsplit("/", 1)[-1], 1)
+
+def key_fingerprint(key):
+    return hashlib.sha256(key.encode()).hexdigest()[:12]
+
+def quota_day():
+    # YouTube quotas reset at midnight Pacific time.
+    return datetime.now(QUOTA_TIMEZONE).date().isoformat()
+
+class KeyPool:
+    """Rotating set of API keys with per-key quota accounting.
+
+    Pass a KeyPool anywhere an `api_key` is expected. Every request is charged
+    to the key that served it, and a key that hits `quotaExceeded` is retired
+    for the rest of the quota day. Usage is persisted (by key fingerprint, never
+    the key itself) so counters survive restarts: every `save_every` units,
+    whenever a key is retired, and at interpreter exit.
+    """
+
+    def __init__(self, keys, daily_quota=DEFAULT_DAILY_QUOTA,
+                 state_path=os.path.join(DEFAULT_STATE_DIR, "quota.json"), save_every=DEFAULT_SAVE_EVERY):
+        self.keys = [k for k in keys if k]
+        if not self.keys:
+            raise ValueError("KeyPool needs at least one API key")
+        self.daily_quota = daily_quota
+        self.state_path = state_path
+        self.save_every = save_every
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self._state = self._load()
+        atexit.register(self.flush)
+
+    def _load(self):
+        state = read_json(self.state_path) if self.state_path else None
+        if not state or state.get("day") != quota_day():
+            state = {"day": quota_day(), "used": {}, "exhausted": []}
+        return state
+
+    def _save(self):
+        if not self.state_path:
+            return
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        write_json_atomic(self.state_path, self._state)
+        self._unsaved = 0
+
+    def _roll_day(self):
+        if self._state["day"] != quota_day():
+            self._state = {"day": quota_day(), "used": {}, "exhausted": []}
+
+    def _remaining(self, key):
+        fingerprint = key_fingerprint(key)
+        if fingerprint in self._state["exhausted"]:
+            return 0
+        return max(0, self.daily_quota - self._state["used"].get(fingerprint, 0))
+
+    def current_key(self):
+        with self._lock:
+            self._roll_day()
+            for key in self.keys:
+                if self._remaining(key) > 0:
+                    return key
+        raise QuotaExceededError(403, "quotaExceeded", "all API keys in the pool are exhausted")
+
+    def record(self, key, url):
+        with self._lock:
+            self._roll_day()
+            fingerprint = key_fingerprint(key)
+            cost = endpoint_cost(url)
+            self._state["used"][fingerprint] = self._state["used"].get(fingerprint, 0) + cost
+            self._unsaved += cost
+            if self._unsaved >= self.save_every:
+                self._save()
+
+    def mark_exhausted(self, key):
+        with self._lock:
+            fingerprint = key_fingerprint(key)
+            if fingerprint not in self._state["exhausted"]:
+                self._state["exhausted"].append(fingerprint)
+            self._save()
+
+    def flush(self):
+        """Write any unsaved usage to disk."""
+        with self._lock:
+            if self._unsaved:
+                self._save()
+
+    def remaining(self):
+        """Remaining units per key fingerprint for the current quota day."""
+        with self._lock:
+            self._roll_day()
+            return {key_fingerprint(key): self._remaining(key) for key in self.keys}
+
+    def total_remaining(self):
+        return sum(self.remaining().values())
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Build from YOUTUBE_API_KEYS (comma separated) or YOUTUBE_API_KEY."""
+        keys = os.getenv("YOUTUBE_API_KEYS") or os.getenv("YOUTUBE_API_KEY") or ""
+        keys = [k.strip() for k in keys.split(",") if k.strip()]
+        return cls(keys, **kwargs) if keys else None
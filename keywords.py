@@ -0,0 +1,80 @@
+import json
+import os
+import re
+from collections import namedtuple
+
+DEFAULT_VOCABULARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vocabulary.json")
+# A negated keyword counts toward the opposite category ("not bad" is affirmative).
+OPPOSITE = {"criticism": "affirmative", "affirmative": "criticism"}
+
+KeywordHit = namedtuple("KeywordHit", ["category", "keyword", "negated", "start"])
+
+def normalize_text(text):
+    # Lowercase, unify apostrophes and collapse whitespace runs to one space.
+    return " ".join(text.lower().replace("’", "'").split())
+
+def _alternation(words):
+    # Longest first so multi-word entries win over their prefixes.
+    return "|".join(re.escape(w) for w in sorted(set(words), key=len, reverse=True))
+
+class KeywordMatcher:
+    """Word-bounded keyword matcher with negation handling.
+
+    All categories compile into one alternation regex, so a single `finditer`
+    pass over the normalized text finds every hit regardless of vocabulary
+    size. For vectorized `str.contains` masks over normalized text there are
+    cheap per-category `keyword_patterns`, a `negated_pattern` that flags
+    texts containing any negated keyword, and `category_patterns` with the
+    negation flip folded in (only needed for the flagged texts).
+    """
+
+    def __init__(self, criticism, affirmative, negations=()):
+        self.vocabulary = {"criticism": list(criticism), "affirmative": list(affirmative)}
+        self.negations = list(negations)
+        negation = _alternation(self.negations)
+        keywords = "|".join(f"(?P<{category}>{_alternation(words)})"
+                            for category, words in self.vocabulary.items())
+        prefix = rf"(?P<negation>\b(?:{negation}) )?" if self.negations else ""
+        self.pattern = re.compile(rf"{prefix}\b(?:{keywords})\b")
+        self.keyword_patterns = {
+            category: re.compile(rf"\b(?:{_alternation(words)})\b")
+            for category, words in self.vocabulary.items()
+        }
+        all_keywords = _alternation(w for words in self.vocabulary.values() for w in words)
+        self.negated_pattern = (re.compile(rf"\b(?:{negation}) (?:{all_keywords})\b")
+                                if self.negations else None)
+        self.category_patterns = {
+            category: self._category_pattern(category) for category in self.vocabulary
+        }
+
+    def _category_pattern(self, category):
+        if not self.negations:
+            return self.keyword_patterns[category]
+        # One fixed-width lookbehind per negation word; text must be normalized
+        # so the gap is always a single space.
+        not_negated = "".join(rf"(?<!\b{re.escape(n)} )" for n in self.negations)
+        words = _alternation(self.vocabulary[category])
+        flipped = f"(?:{_alternation(self.negations)}) (?:{_alternation(self.vocabulary[OPPOSITE[category]])})"
+        return re.compile(rf"\b(?:{not_negated}(?:{words})|{flipped})\b")
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_VOCABULARY_PATH):
+        with open(path, encoding="utf-8") as f:
+            vocabulary = json.load(f)
+        return cls(vocabulary.get("criticism", []), vocabulary.get("affirmative", []),
+                   vocabulary.get("negations", []))
+
+    def find(self, text, normalized=False):
+        if not normalized:
+            text = normalize_text(text)
+        hits = []
+        for match in self.pattern.finditer(text):
+            category = match.lastgroup
+            negated = match.group("negation") is not None if self.negations else False
+            hits.append(KeywordHit(category, match.group(category), negated, match.start()))
+        return hits
+
+    def categories(self, text, normalized=False):
+        """Categories the text counts toward, after negation flips."""
+        return {OPPOSITE[hit.category] if hit.negated else hit.category
+                for hit in self.find(text, normalized)}
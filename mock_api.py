@@ -0,0 +1,424 @@
+"""Local stand-in for the parts of the YouTube Data API the scraper uses.
+
+Serves commentThreads, comments, videos, channels and playlistItems from a
+synthetic, deterministic corpus, with configurable per-request latency and
+randomly injected 403/429/5xx errors. Successful responses honour the
+`fields` partial-response selector (paths, `a/b` and `a(b,c)` groups), so
+byte counts reflect the projection the scraper asks for. Point the scraper
+at it with
+`Transport(base_url=api.base_url)` or the YOUTUBE_API_BASE_URL variable:
+
+    python mock_api.py --comments 100000 --latency 0.05 --error-rate 0.01
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API_PREFIX = "/youtube/v3"
+DEFAULT_COMMENTS = 1000
+DEFAULT_PLAYLIST_VIDEOS = 20
+MAX_INLINE_REPLIES = 5
+# Newest synthetic comment; older ones step back COMMENT_SPACING each.
+CORPUS_EPOCH = datetime(2024, 6, 1, tzinfo=timezone.utc)
+COMMENT_SPACING = timedelta(seconds=37)
+
+WORDS = (
+    "great video love this thanks amazing awesome nice good bad worst hate terrible "
+    "question why how what when first lol the a is was this that really not so very "
+    "tutorial music song part edit audio camera explained helpful disagree agree"
+).split()
+
+# Injected status -> (reason, whether a Retry-After header is sent)
+INJECTED_ERRORS = {
+    403: ("rateLimitExceeded", False),
+    429: ("rateLimitExceeded", True),
+    500: ("backendError", False),
+    503: ("backendError", True),
+}
+
+def _timestamp(index):
+    return (CORPUS_EPOCH - COMMENT_SPACING * index).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def error_body(status, reason, message=None):
+    return {
+        "error": {
+            "code": status,
+            "message": message or reason,
+            "errors": [{"reason": reason, "domain": "youtube.mock", "message": message or reason}],
+        }
+    }
+
+def parse_fields(spec):
+    """Parse a `fields` selector into a nested dict; a None leaf selects the whole value."""
+    tree, _ = _parse_fields(spec, 0)
+    return tree
+
+def _parse_fields(spec, pos):
+    tree = {}
+    while pos < len(spec) and spec[pos] != ")":
+        path = []
+        while True:
+            start = pos
+            while pos < len(spec) and spec[pos] not in ",/()":
+                pos += 1
+            path.append(spec[start:pos].strip())
+            if pos < len(spec) and spec[pos] == "/":
+                pos += 1
+                continue
+            break
+        selection = None
+        if pos < len(spec) and spec[pos] == "(":
+            selection, pos = _parse_fields(spec, pos + 1)
+            pos += 1
+        for name in reversed(path):
+            selection = {name: selection}
+        _merge_fields(tree, selection)
+        if pos < len(spec) and spec[pos] == ",":
+            pos += 1
+    return tree, pos
+
+def _merge_fields(tree, selection):
+    for name, sub in selection.items():
+        if sub is None or tree.get(name, {}) is None:
+            tree[name] = None
+        else:
+            _merge_fields(tree.setdefault(name, {}), sub)
+
+def project_fields(value, tree):
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [project_fields(v, tree) for v in value]
+    if not isinstance(value, dict):
+        return value
+    return {name: project_fields(value[name], sub) for name, sub in tree.items() if name in value}
+
+class MockCorpus:
+    """Deterministic comments for any video id, generated on demand.
+
+    Index 0 is the newest thread. Thread ids count up from the oldest comment,
+    so an id never changes as the corpus grows.
+    """
+
+    def __init__(self, comments=DEFAULT_COMMENTS, seed=0, comment_counts=None, max_replies=12):
+        self.comments = comments
+        self.seed = seed
+        self.comment_counts = comment_counts or {}
+        self.max_replies = max_replies
+
+    def size(self, video_id):
+        return self.comment_counts.get(video_id, self.comments)
+
+    def _rng(self, *key):
+        return random.Random(f"{self.seed}:" + ":".join(map(str, key)))
+
+    def _text(self, rng):
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 25)))
+
+    def reply_count(self, video_id, index):
+        rng = self._rng(video_id, index, "replies")
+        return rng.randint(1, self.max_replies) if rng.random() < 0.2 else 0
+
+    def thread_id(self, video_id, index):
+        return f"{video_id}.{self.size(video_id) - 1 - index}"
+
+    def thread_index(self, thread_id):
+        video_id, number = thread_id.rsplit(".", 1)
+        return video_id, self.size(video_id) - 1 - int(number)
+
+    def comment_snippet(self, video_id, index, rng):
+        text = self._text(rng)
+        published_at = _timestamp(index)
+        return {
+            "channelId": "UCmockchannel",
+            "videoId": video_id,
+            "textDisplay": text,
+            "textOriginal": text,
+            "authorDisplayName": f"@user{rng.randint(1, 50000)}",
+            "authorProfileImageUrl": "https://yt3.ggpht.com/mock-avatar=s48-c-k-c0x00ffffff-no-rj",
+            "authorChannelUrl": f"http://www.youtube.com/channel/UCmock{rng.randint(1, 50000)}",
+            "canRate": True,
+            "viewerRating": "none",
+            "likeCount": int(rng.paretovariate(1.2)) - 1,
+            "publishedAt": published_at,
+            "updatedAt": published_at,
+        }
+
+    def thread(self, video_id, index, include_replies=False):
+        thread_id = self.thread_id(video_id, index)
+        snippet = self.comment_snippet(video_id, index, self._rng(video_id, index))
+        total_replies = self.reply_count(video_id, index)
+        item = {
+            "kind": "youtube#commentThread",
+            "etag": hashlib.md5(thread_id.encode()).hexdigest(),
+            "id": thread_id,
+            "snippet": {
+                "channelId": "UCmockchannel",
+                "videoId": video_id,
+                "topLevelComment": {"kind": "youtube#comment", "id": thread_id, "snippet": snippet},
+                "canReply": True,
+                "totalReplyCount": total_replies,
+                "isPublic": True,
+            },
+        }
+        if include_replies and total_replies:
+            inline = min(total_replies, MAX_INLINE_REPLIES)
+            item["replies"] = {"comments": [self.reply(thread_id, n) for n in range(inline)]}
+        return item
+
+    def reply(self, thread_id, number):
+        video_id, index = self.thread_index(thread_id)
+        snippet = self.comment_snippet(video_id, index, self._rng(thread_id, "reply", number))
+        snippet["parentId"] = thread_id
+        return {"kind": "youtube#comment", "id": f"{thread_id}.{number}", "snippet": snippet}
+
+class MockYouTubeAPI:
+    """Threaded HTTP server around a MockCorpus.
+
+    Use as a context manager (or call start()/stop()) and read `base_url`.
+    `stats` counts requests, injected errors and response bytes.
+    """
+
+    def __init__(self, comments=DEFAULT_COMMENTS, latency=0.0, error_rate=0.0,
+                 error_statuses=tuple(INJECTED_ERRORS), seed=0, comment_counts=None,
+                 disabled_videos=(), playlist_videos=DEFAULT_PLAYLIST_VIDEOS, host="127.0.0.1", port=0):
+        self.corpus = MockCorpus(comments, seed, comment_counts)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.disabled_videos = set(disabled_videos)
+        self.playlist_videos = playlist_videos
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "bytes_sent": 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _injected_error(self):
+        with self._lock:
+            if not self.error_statuses or self._rng.random() >= self.error_rate:
+                return None
+            return self._rng.choice(self.error_statuses)
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without TCP_NODELAY
+            # small gzip bodies stall ~40 ms on delayed ACKs.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                api._count("requests")
+                if api.latency:
+                    time.sleep(api.latency)
+                parsed = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                status = api._injected_error()
+                if status is not None:
+                    api._count("errors")
+                    reason, retry_after = INJECTED_ERRORS.get(status, ("backendError", False))
+                    headers = {"Retry-After": "1"} if retry_after else {}
+                    return self._send(status, error_body(status, reason), headers)
+                route = parsed.path[len(API_PREFIX):] if parsed.path.startswith(API_PREFIX) else None
+                handler = {
+                    "/commentThreads": api.comment_threads,
+                    "/comments": api.comments,
+                    "/videos": api.videos,
+                    "/channels": api.channels,
+                    "/playlistItems": api.playlist_items,
+                }.get(route)
+                if handler is None:
+                    return self._send(404, error_body(404, "notFound", f"no route {parsed.path}"))
+                status, body = handler(params)
+                if status == 200 and params.get("fields"):
+                    body = project_fields(body, parse_fields(params["fields"]))
+                self._send(status, body)
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body).encode()
+                etag = '"' + hashlib.md5(payload).hexdigest() + '"'
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                encoding = None
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    payload = gzip.compress(payload, compresslevel=5)
+                    encoding = "gzip"
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("Content-Length", str(len(payload)))
+                if encoding:
+                    self.send_header("Content-Encoding", encoding)
+                if status == 200:
+                    self.send_header("ETag", etag)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+                api._count("bytes_sent", len(payload))
+
+        return Handler
+
+    def _page(self, total, params, default_size, build):
+        offset = int(params.get("pageToken", "0") or 0)
+        size = min(int(params.get("maxResults", default_size)), 100)
+        items = [build(i) for i in range(offset, min(offset + size, total))]
+        body = {"pageInfo": {"totalResults": total, "resultsPerPage": size}, "items": items}
+        if offset + size < total:
+            body["nextPageToken"] = str(offset + size)
+        return body
+
+    def comment_threads(self, params):
+        video_id = params.get("videoId")
+        if not video_id:
+            return 400, error_body(400, "missingRequiredParameter", "videoId is required")
+        if video_id in self.disabled_videos:
+            return 403, error_body(403, "commentsDisabled", "comments are disabled for this video")
+        include_replies = "replies" in params.get("part", "")
+        total = self.corpus.size(video_id)
+        search_terms = params.get("searchTerms", "").lower()
+        if not search_terms:
+            return 200, self._page(total, params, 20,
+                                   lambda i: self.corpus.thread(video_id, i, include_replies))
+
+        # Scan forward from the token until the page is full of matches.
+        offset = int(params.get("pageToken", "0") or 0)
+        size = min(int(params.get("maxResults", 20)), 100)
+        items = []
+        index = offset
+        while index < total and len(items) < size:
+            item = self.corpus.thread(video_id, index, include_replies)
+            if search_terms in item["snippet"]["topLevelComment"]["snippet"]["textDisplay"].lower():
+                items.append(item)
+            index += 1
+        body = {"items": items}
+        if index < total:
+            body["nextPageToken"] = str(index)
+        return 200, body
+
+    def comments(self, params):
+        parent_id = params.get("parentId")
+        if not parent_id:
+            return 400, error_body(400, "missingRequiredParameter", "parentId is required")
+        try:
+            video_id, index = self.corpus.thread_index(parent_id)
+        except ValueError:
+            return 404, error_body(404, "commentNotFound", f"no comment {parent_id}")
+        total = self.corpus.reply_count(video_id, index)
+        return 200, self._page(total, params, 20, lambda n: self.corpus.reply(parent_id, n))
+
+    def videos(self, params):
+        items = []
+        for video_id in params.get("id", "").split(",")[:50]:
+            if not video_id:
+                continue
+            items.append({
+                "kind": "youtube#video",
+                "id": video_id,
+                "snippet": {
+                    "title": f"Mock video {video_id}",
+                    "channelTitle": "Mock Channel",
+                    "publishedAt": _timestamp(self.corpus.size(video_id) + 1),
+                },
+                "statistics": {
+                    "viewCount": str(self.corpus.size(video_id) * 40),
+                    "likeCount": str(self.corpus.size(video_id) * 2),
+                    "commentCount": str(self.corpus.size(video_id)),
+                },
+            })
+        return 200, {"items": items}
+
+    def channels(self, params):
+        channel = params.get("id") or params.get("forHandle") or params.get("forUsername")
+        if not channel:
+            return 200, {"items": []}
+        return 200, {"items": [{
+            "id": channel,
+            "contentDetails": {"relatedPlaylists": {"uploads": f"UU{channel.lstrip('@')}"}},
+        }]}
+
+    def playlist_items(self, params):
+        playlist_id = params.get("playlistId", "")
+        return 200, self._page(
+            self.playlist_videos, params, 5,
+            lambda i: {"contentDetails": {"videoId": f"{playlist_id}v{i}"}},
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--comments", type=int, default=DEFAULT_COMMENTS, help="comment threads per video")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-statuses", default="403,429,500,503",
+                        help="comma-separated statuses to inject")
+    parser.add_argument("--disabled", default="", help="comma-separated video ids with comments disabled")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    api = MockYouTubeAPI(
+        comments=args.comments,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_statuses=[int(s) for s in args.error_statuses.split(",") if s],
+        seed=args.seed,
+        disabled_videos=[v for v in args.disabled.split(",") if v],
+        host=args.host,
+        port=args.port,
+    )
+    print(f"Mock YouTube Data API listening on {api.base_url}")
+    print(f"Use it with: YOUTUBE_API_BASE_URL={api.base_url}")
+    try:
+        api.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+from scraper import DEFAULT_COLUMNS, extract_video_id, flatten_comment_thread, iter_comment_thread_pages
+
+DEFAULT_MIN_INTERVAL = 5.0
+DEFAULT_MAX_INTERVAL = 300.0
+DEFAULT_HEAD_PAGES = 3
+# Aim for about this many new comments per poll: enough to be worth the
+# request, far below a 100-item page so a burst doesn't overflow the head.
+DEFAULT_TARGET_PER_POLL = 20
+SEEN_ID_LIMIT = 10000
+
+class CommentMonitor:
+    """Live feed of new comments on one video.
+
+    Each poll reads newest-first commentThreads pages only until it reaches a
+    thread it has already seen (normally within the first page), so a quiet
+    video costs one quota unit per poll. Thread ids are deduplicated, and the
+    poll interval tracks comment velocity: it shrinks towards `min_interval`
+    while comments pour in and backs off towards `max_interval` when quiet.
+    """
+
+    def __init__(self, api_key, video_url, transport=None, min_interval=DEFAULT_MIN_INTERVAL,
+                 max_interval=DEFAULT_MAX_INTERVAL, head_pages=DEFAULT_HEAD_PAGES,
+                 target_per_poll=DEFAULT_TARGET_PER_POLL, columns=DEFAULT_COLUMNS, emit_existing=False):
+        self.api_key = api_key
+        self.video_id = extract_video_id(video_url)
+        self.transport = transport
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.head_pages = head_pages
+        self.target_per_poll = target_per_poll
+        self.columns = columns
+        self.interval = min_interval
+        self.total_emitted = 0
+        self._emit_next = emit_existing
+        self._seen = set()
+        self._seen_order = deque()
+        self._last_poll = None
+
+    def _remember(self, thread_id):
+        self._seen.add(thread_id)
+        self._seen_order.append(thread_id)
+        if len(self._seen_order) > SEEN_ID_LIMIT:
+            self._seen.discard(self._seen_order.popleft())
+
+    def poll(self):
+        """Fetch the head of the comment list and return unseen comments,
+        oldest first. The first poll only records a baseline unless
+        `emit_existing` was set."""
+        new_threads = []
+        overflowed = True
+        pages = iter_comment_thread_pages(self.api_key, self.video_id, transport=self.transport)
+        for page in islice(pages, self.head_pages):
+            items = page.get("items", [])
+            fresh = [item for item in items if item["id"] not in self._seen]
+            new_threads.extend(fresh)
+            if len(fresh) < len(items) or not page.get("nextPageToken"):
+                overflowed = False
+                break
+        pages.close()
+
+        for item in new_threads:
+            self._remember(item["id"])
+        now = time.monotonic()
+        emit = self._emit_next
+        self._emit_next = True
+        if emit and self._last_poll is not None:
+            self._adapt(len(new_threads), now - self._last_poll, overflowed)
+        self._last_poll = now
+        if not emit:
+            return []
+
+        comments = [flatten_comment_thread(item, self.columns) for item in reversed(new_threads)]
+        self.total_emitted += len(comments)
+        return comments
+
+    def _adapt(self, new_count, elapsed, overflowed):
+        if overflowed:
+            # More new comments than the head pages hold: poll as fast as allowed.
+            self.interval = self.min_interval
+            return
+        if new_count == 0:
+            ideal = self.interval * 1.5
+        else:
+            ideal = self.target_per_poll * elapsed / new_count
+        # Smooth so one burst or lull doesn't swing the interval to an extreme.
+        self.interval = min(self.max_interval, max(self.min_interval, (self.interval + ideal) / 2))
+
+    def run(self, callback, stop_event=None, max_polls=None):
+        """Poll until `stop_event` is set (or `max_polls` is reached), calling
+        `callback(comment)` for each new comment."""
+        stop_event = stop_event or threading.Event()
+        polls = 0
+        while not stop_event.is_set():
+            for comment in self.poll():
+                callback(comment)
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                break
+            stop_event.wait(self.interval)
+
+    async def stream(self):
+        """Async iterator over new comments; polls run in a worker thread."""
+        while True:
+            for comment in await asyncio.to_thread(self.poll):
+                yield comment
+            await asyncio.sleep(self.interval)
+
+    def __aiter__(self):
+        return self.stream()
@@ -0,0 +1,259 @@
+import importlib.util
+import os
+import re
+import threading
+from xml.etree import ElementTree
+
+import numpy as np
+import pandas as pd
+
+def _textblob_lexicon_path():
+    spec = importlib.util.find_spec("textblob")
+    if spec is None or not spec.submodule_search_locations:
+        return None
+    return os.path.join(spec.submodule_search_locations[0], "en", "en-sentiment.xml")
+
+DEFAULT_LEXICON_PATH = _textblob_lexicon_path()
+NEGATIONS = ("no", "not", "n't", "never")
+MODIFIER_POS = "RB"
+NEGATION_FACTOR = -0.5
+EXCLAMATION_FACTOR = 1.25
+
+# (polarity, emoticons) in the order pattern checks them; first match wins.
+EMOTICONS = [
+    (+1.00, ("<3", "♥")),
+    (+1.00, (">:D", ":-D", ":D", "=-D", "=D", "X-D", "x-D", "XD", "xD", "8-D")),
+    (+0.75, (">:P", ":-P", ":P", ":-p", ":p", ":-b", ":b", ":c)", ":o)", ":^)")),
+    (+0.50, (">:)", ":-)", ":)", "=)", "=]", ":]", ":}", ":>", ":3", "8)", "8-)")),
+    (+0.25, (">;]", ";-)", ";)", ";-]", ";]", ";D", ";^)", "*-)", "*)")),
+    (+0.05, (">:o", ":-O", ":O", ":o", ":-o", "o_O", "o.O", "°O°", "°o°")),
+    (-0.25, (">:/", ":-/", ":/", ":\\", ">:\\", ":-.", ":-s", ":s", ":S", ":-S", ">.>")),
+    (-0.75, (">:[", ":-(", ":(", "=(", ":-[", ":[", ":{", ":-<", ":c", ":-c", "=/")),
+    (-1.00, (":'(", ":'''(", ";'(")),
+]
+EMOTICON_POLARITY = {}
+for _polarity, _faces in EMOTICONS:
+    for _face in _faces:
+        EMOTICON_POLARITY.setdefault(_face.lower(), _polarity)
+
+# --- pattern's tokenizer, reduced to the flat word list sentiment uses ---
+
+PUNCTUATION = ".,;:!?()[]{}`''\"@#$^&*+-|=~_"
+LEADING_PUNCTUATION = tuple(PUNCTUATION.replace(".", ""))
+TRAILING_PUNCTUATION = LEADING_PUNCTUATION + (".",)
+ABBREVIATIONS = {
+    "a.", "adj.", "adv.", "al.", "a.m.", "c.", "cf.", "comp.", "conf.", "def.", "ed.", "e.g.",
+    "esp.", "etc.", "ex.", "f.", "fig.", "gen.", "id.", "i.e.", "int.", "l.", "m.", "Med.",
+    "Mil.", "Mr.", "n.", "n.q.", "orig.", "pl.", "pred.", "pres.", "p.m.", "ref.", "v.", "vs.",
+    "w/",
+}
+RE_ABBR1 = re.compile(r"^[A-Za-z]\.$")
+RE_ABBR2 = re.compile(r"^([A-Za-z]\.)+$")
+RE_ABBR3 = re.compile("^[A-Z][" + "|".join("bcdfghjklmnpqrstvwxz") + "]+.$")
+CONTRACTIONS = ("'d", "'m", "'s", "'ll", "'re", "'ve", "n't")
+QUOTES = ("“", "”", "‘", "’", "'", '"')
+RE_SARCASM = re.compile(r"\( ?\! ?\)")
+RE_EMOTICONS = re.compile(r"(%s)($|\s)" % "|".join(
+    r" ?".join(re.escape(c) for c in face) for _, faces in EMOTICONS for face in faces))
+END_OF_SENTENCE = "END-OF-SENTENCE"
+
+def _is_abbreviation(token):
+    return (token in ABBREVIATIONS or RE_ABBR1.match(token) is not None
+            or RE_ABBR2.match(token) is not None or RE_ABBR3.match(token) is not None)
+
+def pattern_tokens(text):
+    """Lowercased words as TextBlob's sentiment sees them after find_tokens."""
+    for contraction in CONTRACTIONS:
+        text = text.replace(contraction, " " + contraction)
+    for quote in QUOTES:
+        text = text.replace(quote, f" {quote} ")
+    text = re.sub(r"\n{2,}", f" {END_OF_SENTENCE} ", text.replace("\r\n", "\n"))
+    tokens = []
+    for t in text.split():
+        tail = []
+        while t.startswith(LEADING_PUNCTUATION) and t not in CONTRACTIONS:
+            tokens.append(t[0])
+            t = t[1:]
+        while t.endswith(TRAILING_PUNCTUATION) and t not in CONTRACTIONS:
+            if t.endswith(LEADING_PUNCTUATION):
+                tail.append(t[-1])
+                t = t[:-1]
+            if t.endswith("..."):
+                tail.append("...")
+                t = t[:-3].rstrip(".")
+            if t.endswith("."):
+                if _is_abbreviation(t):
+                    break
+                tail.append(t[-1])
+                t = t[:-1]
+        if t:
+            tokens.append(t)
+        tokens.extend(reversed(tail))
+    joined = " ".join(t for t in tokens if t != END_OF_SENTENCE)
+    joined = RE_SARCASM.sub("(!)", joined)
+    joined = RE_EMOTICONS.sub(lambda m: m.group(1).replace(" ", "") + m.group(2), joined)
+    return [w.lower() for w in joined.split()]
+
+# --- lexicon ---
+
+def load_lexicon(path=DEFAULT_LEXICON_PATH):
+    """Word -> (polarity, subjectivity, intensity, is_modifier) from a pattern sentiment XML.
+
+    Mirrors pattern's loader: scores are averaged over word senses per
+    part-of-speech, then over parts-of-speech, and every adjective also
+    yields an "-ly" adverb with the same scores.
+    """
+    if path is None or not os.path.exists(path):
+        raise FileNotFoundError(
+            f"sentiment lexicon not found at {path!r}; install textblob or pass the path to en-sentiment.xml")
+    senses = {}
+    for node in ElementTree.parse(path).getroot().findall("word"):
+        form = node.attrib.get("form")
+        if not form:
+            continue
+        scores = (float(node.attrib.get("polarity", 0.0)),
+                  float(node.attrib.get("subjectivity", 0.0)),
+                  float(node.attrib.get("intensity", 1.0)))
+        senses.setdefault(form, {}).setdefault(node.attrib.get("pos"), []).append(scores)
+    lexicon = {}
+    by_pos = {}
+    for form, tags in senses.items():
+        by_pos[form] = {pos: [sum(s) / len(s) for s in zip(*scores)] for pos, scores in tags.items()}
+        averaged = [sum(s) / len(s) for s in zip(*by_pos[form].values())]
+        lexicon[form] = (*averaged, MODIFIER_POS in tags)
+    for form, tags in by_pos.items():
+        if "JJ" not in tags:
+            continue
+        stem = form[:-1] + "i" if form.endswith("y") else form
+        stem = stem[:-2] if stem.endswith("le") else stem
+        lexicon[stem + "ly"] = (*tags["JJ"], True)
+    return lexicon
+
+class LexiconScorer:
+    """TextBlob-compatible polarity from the pattern lexicon, loaded once.
+
+    `polarity()` is the compatibility mode: a port of pattern's tokenizer and
+    `assessments` (modifiers, negation, "!" boosts, emoticons) that matches
+    TextBlob's PatternAnalyzer. `score_fast()` scores a whole batch with one
+    tokenize/explode pass, an index lookup into compact NumPy score arrays and
+    a bincount average. It only looks one or two tokens back for negations
+    and modifiers and uses a simpler tokenizer, so it is close to, not equal
+    to, TextBlob; labels agree for the large majority of comments.
+    """
+
+    def __init__(self, path=DEFAULT_LEXICON_PATH):
+        self.lexicon = load_lexicon(path)
+        faces = [f for f in EMOTICON_POLARITY if f not in self.lexicon]
+        extra = [w for w in NEGATIONS + ("!",) if w not in self.lexicon]
+        self.vocabulary = pd.Index(list(self.lexicon) + faces + extra)
+        entries = list(self.lexicon.values())
+        self.polarity_table = np.array(
+            [e[0] for e in entries] + [EMOTICON_POLARITY[f] for f in faces] + [0.0] * len(extra))
+        self.intensity_table = np.array([e[2] for e in entries] + [1.0] * (len(faces) + len(extra)))
+        self.modifier_table = np.array([e[3] for e in entries] + [False] * (len(faces) + len(extra)))
+        # Negations and "!" get ids so they can be seen as neighbours, but are not scored.
+        self.scored_table = np.arange(len(self.vocabulary)) < len(entries) + len(faces)
+        self.negation_table = self.vocabulary.isin(NEGATIONS)
+        self.exclamation_id = self.vocabulary.get_loc("!")
+        self.token_pattern = re.compile(
+            r"(?<!\S)(?:%s)(?!\S)|!|[^\W_]+(?:-[^\W_]+)*"
+            % "|".join(map(re.escape, sorted(EMOTICON_POLARITY, key=len, reverse=True))))
+
+    def polarity(self, text):
+        assessments = []
+        modifier = None
+        negation = None
+        for w in pattern_tokens(text):
+            entry = self.lexicon.get(w)
+            if entry is not None:
+                p, _, i, is_modifier = entry
+                if modifier is None:
+                    assessments.append([p, i, 1])
+                else:
+                    last = assessments[-1]
+                    last[0] = max(-1.0, min(p * last[1], 1.0))
+                    last[1] = i
+                if negation is not None:
+                    assessments[-1][1] = 1.0 / assessments[-1][1]
+                    assessments[-1][2] = -1
+                modifier = w if is_modifier else None
+                negation = w if w in NEGATIONS else None
+                continue
+            if w in NEGATIONS:
+                negation = w
+            elif negation and len(w.strip("'")) > 1:
+                negation = None
+            if negation is not None and modifier is not None and modifier.endswith("ly"):
+                assessments[-1][2] = -1
+                negation = None
+            elif modifier and len(w) > 2:
+                modifier = None
+            if w == "!" and assessments:
+                assessments[-1][0] = max(-1.0, min(assessments[-1][0] * EXCLAMATION_FACTOR, 1.0))
+            if w == "(!)":
+                assessments.append([0.0, 1.0, 1])
+            if not w.isalpha() and len(w) <= 5 and w not in PUNCTUATION and w in EMOTICON_POLARITY:
+                assessments.append([EMOTICON_POLARITY[w], 1.0, 1])
+        if not assessments:
+            return 0.0
+        return sum(p * NEGATION_FACTOR if n < 0 else p for p, _, n in assessments) / len(assessments)
+
+    def score_compat(self, texts):
+        texts = list(texts)
+        return np.fromiter((self.polarity(t) for t in texts), dtype=np.float64, count=len(texts))
+
+    def score_fast(self, texts):
+        texts = pd.Series(texts, dtype=object).reset_index(drop=True)
+        tokens = texts.str.lower().str.findall(self.token_pattern).explode().dropna()
+        if tokens.empty:
+            return np.zeros(len(texts))
+        ids = self.vocabulary.get_indexer(tokens.to_numpy(dtype=object))
+        docs = tokens.index.to_numpy()
+        prev = self._shift(ids, docs, 1)
+        prev2 = self._shift(ids, docs, 2)
+        scored = (ids >= 0) & self.scored_table[ids]
+        scores = np.where(scored, self.polarity_table[ids], 0.0)
+        after_modifier = scored & (prev >= 0) & self.modifier_table[prev]
+        scores = np.where(after_modifier,
+                          np.clip(scores * self.intensity_table[prev], -1.0, 1.0), scores)
+        # A modifier followed by a scored word merges into one assessment.
+        merged = np.zeros_like(scored)
+        merged[:-1] = after_modifier[1:]
+        counted = scored & ~merged
+        # Each "!" boosts the latest assessment of the same comment.
+        positions = np.arange(len(ids))
+        latest = np.maximum.accumulate(np.where(counted, positions, -1))
+        bangs = (ids == self.exclamation_id) & (latest >= 0)
+        bangs &= docs[np.maximum(latest, 0)] == docs
+        boosts = np.bincount(latest[bangs], minlength=len(ids))
+        scores = np.clip(scores * EXCLAMATION_FACTOR ** boosts, -1.0, 1.0)
+        # Negation directly before the word, before its modifier ("not very
+        # nice"), or across a one-letter word ("not a good idea").
+        short = self._shift(np.where(tokens.str.len().to_numpy() <= 1, 1, 0), docs, 1) == 1
+        negated = self._is_negation(prev) | (self._is_negation(prev2) & (after_modifier | short))
+        scores = np.where(counted & negated, scores * NEGATION_FACTOR, scores)
+        totals = np.bincount(docs[counted], weights=scores[counted], minlength=len(texts))
+        counts = np.bincount(docs[counted], minlength=len(texts))
+        return np.divide(totals, counts, out=np.zeros(len(texts)), where=counts > 0)
+
+    def _is_negation(self, ids):
+        """Mask of token ids that are negations; -1 (no token) is not."""
+        return (ids >= 0) & self.negation_table[np.maximum(ids, 0)]
+
+    @staticmethod
+    def _shift(ids, docs, n):
+        """Token id `n` positions back within the same comment, else -1."""
+        shifted = np.full_like(ids, -1)
+        if len(ids) > n:
+            shifted[n:] = np.where(docs[n:] == docs[:-n], ids[:-n], -1)
+        return shifted
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+def get_scorer():
+    global _scorer
+    with _scorer_lock:
+        if _scorer is None:
+            _scorer = LexiconScorer()
+        return _scorer
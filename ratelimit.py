@@ -0,0 +1,75 @@
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 20
+MAX_BACKOFF = 60.0
+
+class TokenBucket:
+    """Token-bucket limiter shared by threads and asyncio tasks alike.
+
+    Callers reserve a token under a plain lock (never held while waiting) and
+    then sleep for however long the reservation says, so the same bucket can
+    pace a thread pool and an event loop at the same time.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.rate = float(rate)
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+# Process-wide bucket every transport paces against unless given its own, so
+# separate transports together stay under the configured rate.
+default_limiter = TokenBucket()
+
+def retry_after_seconds(headers):
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+def backoff_delay(attempt, backoff_base=1.5, retry_after=None, max_delay=MAX_BACKOFF):
+    """Delay before retry number `attempt`.
+
+    Honors the server's Retry-After when given (plus up to 10% jitter so
+    clients don't return in lock-step), otherwise uses full jitter over the
+    exponential ceiling.
+    """
+    if retry_after is not None:
+        return min(max_delay, retry_after * (1 + random.uniform(0, 0.1)))
+    ceiling = min(max_delay, (backoff_base ** attempt) + (attempt * 0.5))
+    return random.uniform(0, ceiling)
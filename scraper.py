@@ -1,57 +1,399 @@
+import os
 import time
 import requests
 import csv
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from datetime import datetime, timezone
 from urllib.parse import urlparse, parse_qs
+from requests.adapters import HTTPAdapter
+import fastjson
+from cache import TTLCache
+from errors import NotFoundError, QuotaExceededError, api_error_from_response
+from keypool import KeyPool, endpoint_cost
+from ratelimit import backoff_delay, default_limiter, retry_after_seconds
+from state import WatermarkStore
 
-def extract_video_id(youtube_url):
+# Override with YOUTUBE_API_BASE_URL (or Transport(base_url=...)) to point the
+# scraper at a stand-in server such as mock_api.py.
+API_BASE_URL = os.getenv("YOUTUBE_API_BASE_URL", "https://www.googleapis.com/youtube/v3")
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = 30
+DEFAULT_REPLY_WORKERS = 4
+DEFAULT_SAMPLE_PAGES = 1
+
+# Output column -> field of the top-level comment snippet.
+COMMENT_FIELDS = {
+    "text": "textDisplay",
+    "published_at": "publishedAt",
+    "like_count": "likeCount",
+    "author": "authorDisplayName",
+    "updated_at": "updatedAt",
+}
+# Output column -> field of the thread snippet.
+THREAD_FIELDS = {
+    "reply_count": "totalReplyCount",
+}
+DEFAULT_COLUMNS = ("text", "published_at", "like_count", "reply_count")
+AVAILABLE_COLUMNS = ("comment_id",) + tuple(COMMENT_FIELDS) + tuple(THREAD_FIELDS)
+REPLY_FIELDS = "textDisplay,publishedAt,likeCount"
+
+VIDEOS_BATCH_SIZE = 50
+PLAYLIST_PAGE_SIZE = 50
+VIDEO_FIELDS = "items(id,snippet(title,channelTitle,publishedAt),statistics(viewCount,likeCount,commentCount))"
+metadata_cache = TTLCache(maxsize=4096, ttl=3600)
+
+class CachedResponse:
+    """Response served from a `ResponseCache`; quacks like requests.Response.
+
+    `from_cache` is False when the body came back via a 304 revalidation,
+    which still costs an API request.
+    """
+
+    status_code = 200
+
+    def __init__(self, content, etag=None, from_cache=True):
+        self.content = content
+        self.from_cache = from_cache
+        self.headers = {"ETag": etag} if etag else {}
+
+def iso_timestamp(value):
+    """Normalise a date, datetime or ISO string to the API's publishedAt format
+    (UTC, `Z` suffix) so timestamps can be compared as strings. Naive values
+    are taken as UTC."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    elif not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+class ScrapeLimits:
+    """Early-termination rules for a comment crawl.
+
+    `max_comments` caps the number of threads, `published_after` /
+    `published_before` bound the publish time (with newest-first ordering the
+    crawl stops at the first thread older than `published_after`), and
+    `deadline` is a wall-clock budget in seconds. After the crawl, `partial`
+    is True if the deadline cut it short.
+    """
+
+    def __init__(self, max_comments=None, published_after=None, published_before=None, deadline=None):
+        self.max_comments = max_comments
+        self.published_after = iso_timestamp(published_after)
+        self.published_before = iso_timestamp(published_before)
+        self.deadline_at = time.monotonic() + deadline if deadline is not None else None
+        self.partial = False
+        self.count = 0
+
+    @property
+    def expired(self):
+        return self.deadline_at is not None and time.monotonic() >= self.deadline_at
+
+    def copy(self):
+        """Fresh limits with the same bounds and the same absolute deadline, for
+        crawling another video under one overall time budget."""
+        limits = ScrapeLimits(self.max_comments, self.published_after, self.published_before)
+        limits.deadline_at = self.deadline_at
+        return limits
+
+    def _admit(self, published_at, ordered_by_time):
+        """Return `(keep, stop)` for one thread; rows without a timestamp are only counted."""
+        if published_at:
+            if self.published_before and published_at >= self.published_before:
+                return False, False
+            if self.published_after and published_at < self.published_after:
+                return False, ordered_by_time
+        self.count += 1
+        return True, self.max_comments is not None and self.count >= self.max_comments
+
+    def trim(self, page, ordered_by_time=True):
+        """Return `(page, stop)`: the page cut down to threads within the limits
+        and whether pagination should stop after it."""
+        items = []
+        stop = False
+        for item in page.get("items", []):
+            keep, stop = self._admit(thread_published_at(item), ordered_by_time)
+            if keep:
+                items.append(item)
+            if stop:
+                break
+        if stop:
+            return {**page, "items": items, "nextPageToken": None}, True
+        page = {**page, "items": items}
+        if page.get("nextPageToken") and self.deadline_at is not None and time.monotonic() >= self.deadline_at:
+            self.partial = True
+            return page, True
+        return page, False
+
+    def trim_rows(self, rows, ordered_by_time=True):
+        """`trim` for already flattened rows, e.g. pages replayed from a checkpoint."""
+        kept = []
+        for row in rows:
+            keep, stop = self._admit(row.get("published_at"), ordered_by_time)
+            if keep:
+                kept.append(row)
+            if stop:
+                return kept, True
+        return kept, False
+
+    def apply(self, pages, ordered_by_time=True):
+        for page in pages:
+            page, stop = self.trim(page, ordered_by_time)
+            yield page
+            if stop:
+                return
+
+class Transport:
+    """Shared keep-alive HTTP session used by every scraper call.
+
+    Connections to googleapis.com are pooled per host, so paging through a
+    large video reuses the same TLS connection instead of handshaking again.
+    With a `ResponseCache`, fresh entries are served without a request and
+    stale ones are revalidated with If-None-Match. Requests are paced by the
+    process-wide `default_limiter` unless a `limiter` is passed.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, limiter=None, cache=None,
+                 base_url=None):
+        self.base_url = (base_url or API_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.limiter = limiter or default_limiter
+        self.cache = cache
+        self.quota_used = 0
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+
+    def endpoint(self, name):
+        return f"{self.base_url}/{name}"
+
+    def get(self, url, params=None):
+        entry = self.cache.lookup(url, params) if self.cache is not None else None
+        if entry is not None and entry.fresh:
+            return CachedResponse(entry.body, entry.etag)
+
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else None
+        self.limiter.acquire()
+        resp = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        if self.cache is None:
+            return resp
+        if resp.status_code == 304 and entry is not None:
+            self.cache.refresh(url, params)
+            # A revalidation is a real API call, so it is charged like one.
+            return CachedResponse(entry.body, entry.etag, from_cache=False)
+        if resp.status_code == 200:
+            self.cache.store(url, params, resp.content, resp.headers.get("ETag"))
+        return resp
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+_default_transport = None
+
+def get_default_transport():
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = Transport()
+    return _default_transport
+
+def parse_youtube_url(youtube_url):
+    """Classify a YouTube URL.
+
+    Returns `(kind, value)` where kind is "video", "playlist", "channel"
+    (value is a channel id), "handle" (an @handle) or "user" (legacy name).
+    """
     parsed = urlparse(youtube_url)
     if parsed.hostname in ("youtu.be", "www.youtu.be"):
-        return parsed.path.lstrip("/")
+        return "video", parsed.path.lstrip("/")
     if parsed.hostname in ("www.youtube.com", "youtube.com", "m.youtube.com"):
         qs = parse_qs(parsed.query)
         if "v" in qs:
-            return qs["v"][0]
+            return "video", qs["v"][0]
         path_parts = parsed.path.split("/")
         if "shorts" in path_parts:
-            return path_parts[-1]
-    raise ValueError("could not extract video id from url: " + youtube_url)
-
-def get_video_title(api_key, video_id):
-    url = "https://www.googleapis.com/youtube/v3/videos"
-    params = {"part": "snippet", "id": video_id, "key": api_key}
-    resp = requests.get(url, params=params)
-    resp.raise_for_status()
-    data = resp.json()
-    title = data["items"][0]["snippet"]["title"]
+            return "video", path_parts[-1]
+        if "list" in qs:
+            return "playlist", qs["list"][0]
+        if len(path_parts) > 1 and path_parts[1].startswith("@"):
+            return "handle", path_parts[1]
+        if len(path_parts) > 2 and path_parts[1] == "channel":
+            return "channel", path_parts[2]
+        if len(path_parts) > 2 and path_parts[1] == "user":
+            return "user", path_parts[2]
+        if len(path_parts) > 2 and path_parts[1] == "c":
+            # Custom URLs are not legacy usernames and the API has no lookup for them.
+            raise ValueError("custom /c/ channel URLs are not supported, use the channel's @handle or "
+                             "/channel/ URL: " + youtube_url)
+    raise ValueError("could not recognise youtube url: " + youtube_url)
+
+def extract_video_id(youtube_url):
+    try:
+        kind, value = parse_youtube_url(youtube_url)
+    except ValueError:
+        kind = None
+    if kind != "video":
+        raise ValueError("could not extract video id from url: " + youtube_url)
+    return value
+
+def video_url(video_id):
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+def channel_params(api_key, kind, value):
+    lookup = {"channel": "id", "handle": "forHandle", "user": "forUsername"}[kind]
+    return {
+        "part": "contentDetails",
+        lookup: value,
+        "key": api_key,
+        "fields": "items/contentDetails/relatedPlaylists/uploads",
+    }
+
+def uploads_playlist_id(data, value):
+    items = data.get("items")
+    if not items:
+        raise NotFoundError(404, "channelNotFound", f"no channel found for {value}")
+    return items[0]["contentDetails"]["relatedPlaylists"]["uploads"]
+
+def playlist_items_params(api_key, playlist_id):
+    return {
+        "part": "contentDetails",
+        "playlistId": playlist_id,
+        "key": api_key,
+        "maxResults": PLAYLIST_PAGE_SIZE,
+        "fields": "nextPageToken,items/contentDetails/videoId",
+    }
+
+def get_video_title(api_key, video_id, transport=None):
+    metadata = get_videos_metadata(api_key, [video_id], transport=transport).get(video_id)
+    if metadata is None:
+        raise NotFoundError(404, "videoNotFound", f"no video with id {video_id}")
+    return sanitize_title(metadata["title"])
+
+def _int_or_none(value):
+    return int(value) if value is not None else None
+
+def video_metadata(item):
+    snippet = item.get("snippet", {})
+    stats = item.get("statistics", {})
+    return {
+        "video_id": item["id"],
+        "title": snippet.get("title", ""),
+        "channel_title": snippet.get("channelTitle"),
+        "published_at": snippet.get("publishedAt"),
+        "view_count": _int_or_none(stats.get("viewCount")),
+        "like_count": _int_or_none(stats.get("likeCount")),
+        "comment_count": _int_or_none(stats.get("commentCount")),
+    }
+
+def videos_params(api_key, video_ids):
+    return {
+        "part": "snippet,statistics",
+        "id": ",".join(video_ids),
+        "key": api_key,
+        "fields": VIDEO_FIELDS,
+    }
+
+def split_cached_metadata(video_ids, cache):
+    """Return `(cached, missing_chunks)` for `video_ids`, with the uncached ids
+    grouped into batches of at most VIDEOS_BATCH_SIZE."""
+    cached = {}
+    missing = []
+    for video_id in dict.fromkeys(video_ids):
+        metadata = cache.get(video_id)
+        if metadata is None:
+            missing.append(video_id)
+        else:
+            cached[video_id] = metadata
+    chunks = [missing[i:i + VIDEOS_BATCH_SIZE] for i in range(0, len(missing), VIDEOS_BATCH_SIZE)]
+    return cached, chunks
+
+def get_videos_metadata(api_key, video_ids, transport=None, cache=None):
+    """Title and statistics for many videos, 50 ids per videos.list call.
+
+    Results are kept in a TTL/LRU cache so repeated lookups are free. Returns
+    a dict keyed by video id; ids the API does not know are left out.
+    """
+    cache = metadata_cache if cache is None else cache
+    transport = transport or get_default_transport()
+    url = transport.endpoint("videos")
+    result, chunks = split_cached_metadata(video_ids, cache)
+    for chunk in chunks:
+        response = exponential_backoff_request(url, videos_params(api_key, chunk), transport=transport)
+        for item in fastjson.loads(response.content).get("items", []):
+            metadata = video_metadata(item)
+            cache.set(metadata["video_id"], metadata)
+            result[metadata["video_id"]] = metadata
+    return result
+
+def sanitize_title(title):
     safe_title = "".join(c for c in title if c.isalnum() or c in (" ", "-", "_")).rstrip()
     return safe_title or "youtube_comments"
 
-def exponential_backoff_request(url, params, max_retries=6, backoff_base=1.5):
-    for attempt in range(max_retries):
-        resp = requests.get(url, params=params, timeout=30)
+def exponential_backoff_request(url, params, max_retries=6, backoff_base=1.5, transport=None):
+    """GET with retries for transient failures only.
+
+    Permanent API errors (quotaExceeded, commentsDisabled, forbidden, ...)
+    raise their typed `YouTubeAPIError` subclass on the first response. When
+    `params["key"]` is a `KeyPool`, each request is charged to the key used
+    and quotaExceeded rotates to the next key without counting as a retry.
+    Once `max_retries` attempts have failed, the last error is raised.
+    """
+    transport = transport or get_default_transport()
+    pool = params.get("key") if isinstance(params.get("key"), KeyPool) else None
+    attempt = 0
+    error = None
+    while attempt < max_retries:
+        request_params = params
+        if pool is not None:
+            key = pool.current_key()
+            request_params = {**params, "key": key}
+        resp = transport.get(url, params=request_params)
+        if not getattr(resp, "from_cache", False):
+            transport.quota_used += endpoint_cost(url)
+            if pool is not None:
+                pool.record(key, url)
         if resp.status_code == 200:
             return resp
-        if resp.status_code in (403, 429, 500, 503):
-            wait = (backoff_base ** attempt) + (attempt * 0.5)
-            time.sleep(wait)
+        error = api_error_from_response(resp.status_code, resp.content)
+        if pool is not None and isinstance(error, QuotaExceededError):
+            pool.mark_exhausted(key)
             continue
-        resp.raise_for_status()
-    raise RuntimeError(f"max retries reached for url {url} (last status {resp.status_code})")
+        if not error.retryable:
+            raise error
+        time.sleep(backoff_delay(attempt, backoff_base, retry_after_seconds(resp.headers)))
+        attempt += 1
+    if error is None:
+        raise ValueError(f"max_retries must be at least 1, got {max_retries}")
+    # Out of retries: surface the last typed error so callers can report its reason.
+    raise error
 
-def fetch_all_comment_threads(api_key, video_id):
-    endpoint = "https://www.googleapis.com/youtube/v3/commentThreads"
-    params = {
-        "part": "snippet",
-        "videoId": video_id,
-        "key": api_key,
-        "maxResults": 100,
-        "textFormat": "plainText",
-        "order": "time"
-    }
+def iter_comment_thread_pages(api_key, video_id, transport=None, page_token=None, include_replies=False,
+                              columns=DEFAULT_COLUMNS, order="time", search_terms=None):
+    """Yield raw commentThreads response pages, newest first (or top comments
+    first with `order="relevance"`).
 
-    comments = []
-    next_token = None
-    page = 0
+    Only the fields needed for `columns` are requested (see
+    `comment_thread_fields`).
+    """
+    transport = transport or get_default_transport()
+    endpoint = transport.endpoint("commentThreads")
+    params = comment_thread_params(api_key, video_id, include_replies=include_replies, columns=columns,
+                                   order=order, search_terms=search_terms)
+    next_token = page_token
 
     while True:
         if next_token:
@@ -59,32 +401,293 @@ def fetch_all_comment_threads(api_key, video_id):
         else:
             params.pop("pageToken", None)
 
-        response = exponential_backoff_request(endpoint, params)
-        data = response.json()
-        items = data.get("items", [])
-        page += 1
-        comments.extend(items)
+        response = exponential_backoff_request(endpoint, params, transport=transport)
+        data = fastjson.loads(response.content)
+        yield data
 
         next_token = data.get("nextPageToken")
         if not next_token:
             break
 
-        time.sleep(0.1)
+def fetch_all_comment_threads(api_key, video_id, transport=None):
+    comments = []
+    for page in iter_comment_thread_pages(api_key, video_id, transport=transport):
+        comments.extend(page.get("items", []))
     return comments
 
-def flatten_comment_thread(thread_item):
+def fetch_replies(api_key, parent_id, transport=None):
+    transport = transport or get_default_transport()
+    endpoint = transport.endpoint("comments")
+    params = {
+        "part": "snippet",
+        "parentId": parent_id,
+        "key": api_key,
+        "maxResults": 100,
+        "textFormat": "plainText",
+        "fields": f"nextPageToken,items/snippet({REPLY_FIELDS})",
+    }
+
+    replies = []
+    while True:
+        response = exponential_backoff_request(endpoint, params, transport=transport)
+        data = fastjson.loads(response.content)
+        replies.extend(flatten_comment(item) for item in data.get("items", []))
+
+        next_token = data.get("nextPageToken")
+        if not next_token:
+            break
+        params["pageToken"] = next_token
+    return replies
+
+def _submit_reply_fetches(api_key, page, executor, transport, columns):
+    comments = []
+    pending = []
+    for item in page.get("items", []):
+        comment = flatten_comment_thread(item, columns)
+        inline = item.get("replies", {}).get("comments", [])
+        if item["snippet"].get("totalReplyCount", 0) > len(inline):
+            pending.append((comment, executor.submit(fetch_replies, api_key, item["id"], transport)))
+        else:
+            comment["replies"] = [flatten_comment(reply) for reply in inline]
+        comments.append(comment)
+    return comments, pending, page.get("nextPageToken")
+
+def _collect_replies(comments, pending, next_token):
+    for comment, future in pending:
+        comment["replies"] = future.result()
+    return comments, next_token
+
+def iter_pages_with_replies(api_key, pages, transport=None, workers=DEFAULT_REPLY_WORKERS,
+                            columns=DEFAULT_COLUMNS):
+    """Flatten raw thread pages and attach each thread's full reply list.
+
+    Threads with more replies than commentThreads returns inline are expanded
+    through `comments.list` on a bounded worker pool. A page is held back until
+    the next one has been requested, so reply fetches overlap pagination.
+    Yields `(comments, next_page_token)` pairs.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = None
+        for page in pages:
+            current = _submit_reply_fetches(api_key, page, executor, transport, columns)
+            if pending is not None:
+                yield _collect_replies(*pending)
+            pending = current
+        if pending is not None:
+            yield _collect_replies(*pending)
+
+def checkpoint_config(columns=DEFAULT_COLUMNS, include_replies=False, order="time", limits=None):
+    # Everything that changes the shape, order or selection of checkpointed
+    # rows. Pages are saved after the date window is applied, so it counts too.
+    return {
+        "columns": list(columns),
+        "include_replies": bool(include_replies),
+        "order": order,
+        "published_after": limits.published_after if limits is not None else None,
+        "published_before": limits.published_before if limits is not None else None,
+    }
+
+def iter_comment_pages(api_key, video_id, transport=None, checkpoints=None,
+                       expand_replies=False, reply_workers=DEFAULT_REPLY_WORKERS, columns=DEFAULT_COLUMNS,
+                       limits=None, order="time", max_pages=None, search_terms=None):
+    """Yield one list of flattened comments per API page.
+
+    With a `CheckpointStore`, pages saved by an earlier interrupted run are
+    replayed first and fetching resumes from the saved page token. With
+    `ScrapeLimits`, pagination stops as soon as a limit is reached.
+    """
+    page_token = None
+    config = checkpoint_config(columns, expand_replies, order, limits)
+    if checkpoints is not None:
+        saved_pages, page_token = checkpoints.load(video_id, config)
+        for comments in saved_pages:
+            stop = False
+            if limits is not None:
+                comments, stop = limits.trim_rows(comments, ordered_by_time=order == "time")
+            yield comments
+            if stop:
+                return
+        if saved_pages and not page_token:
+            return
+
+    pages = iter_comment_thread_pages(api_key, video_id, transport=transport, page_token=page_token,
+                                      include_replies=expand_replies, columns=columns, order=order,
+                                      search_terms=search_terms)
+    if max_pages is not None:
+        pages = islice(pages, max_pages)
+    if limits is not None:
+        pages = limits.apply(pages, ordered_by_time=order == "time")
+    if expand_replies:
+        pages = iter_pages_with_replies(api_key, pages, transport=transport, workers=reply_workers,
+                                        columns=columns)
+    else:
+        pages = (([flatten_comment_thread(item, columns) for item in page.get("items", [])],
+                  page.get("nextPageToken"))
+                 for page in pages)
+
+    for comments, next_token in pages:
+        if checkpoints is not None:
+            checkpoints.append(video_id, comments, next_token, config)
+        yield comments
+
+def iter_comments(api_key, video_id, transport=None, checkpoints=None,
+                  expand_replies=False, reply_workers=DEFAULT_REPLY_WORKERS, columns=DEFAULT_COLUMNS,
+                  limits=None, order="time", max_pages=None, search_terms=None):
+    for page in iter_comment_pages(api_key, video_id, transport=transport, checkpoints=checkpoints,
+                                   expand_replies=expand_replies, reply_workers=reply_workers,
+                                   columns=columns, limits=limits, order=order, max_pages=max_pages,
+                                   search_terms=search_terms):
+        yield from page
+
+def thread_published_at(thread_item):
+    return thread_item["snippet"]["topLevelComment"]["snippet"]["publishedAt"]
+
+def is_before_watermark(thread_item, watermark):
+    if not watermark:
+        return False
+    published_at = thread_published_at(thread_item)
+    if published_at != watermark["published_at"]:
+        return published_at < watermark["published_at"]
+    return thread_item["id"] in watermark["thread_ids"]
+
+def advance_watermark(watermark, thread_items):
+    if not thread_items:
+        return watermark
+    newest = max(thread_published_at(t) for t in thread_items)
+    thread_ids = [t["id"] for t in thread_items if thread_published_at(t) == newest]
+    return {"published_at": newest, "thread_ids": thread_ids}
+
+def iter_new_comment_threads(api_key, video_id, watermark, transport=None):
+    """Yield threads newer than `watermark`, stopping pagination at the first
+    one already seen (pages are ordered newest first)."""
+    for page in iter_comment_thread_pages(api_key, video_id, transport=transport):
+        for item in page.get("items", []):
+            if is_before_watermark(item, watermark):
+                return
+            yield item
+
+def comment_thread_fields(columns=DEFAULT_COLUMNS, include_replies=False):
+    """Partial-response `fields` selector covering `columns`.
+
+    The thread id, publishedAt and totalReplyCount are always kept because
+    watermarks, date limits and reply expansion rely on them.
+    """
+    unknown = set(columns) - set(AVAILABLE_COLUMNS)
+    if unknown:
+        raise ValueError("unknown comment columns: " + ", ".join(sorted(unknown)))
+    comment_fields = ["publishedAt"]
+    for column in columns:
+        field = COMMENT_FIELDS.get(column)
+        if field and field not in comment_fields:
+            comment_fields.append(field)
+    items = f"id,snippet(totalReplyCount,topLevelComment/snippet({','.join(comment_fields)}))"
+    if include_replies:
+        items += f",replies/comments/snippet({REPLY_FIELDS})"
+    return f"nextPageToken,items({items})"
+
+def comment_thread_params(api_key, video_id, include_replies=False, columns=DEFAULT_COLUMNS, order="time",
+                          search_terms=None):
+    params = {
+        "part": "snippet,replies" if include_replies else "snippet",
+        "videoId": video_id,
+        "key": api_key,
+        "maxResults": 100,
+        "textFormat": "plainText",
+        "order": order,
+        "fields": comment_thread_fields(columns, include_replies),
+    }
+    if search_terms:
+        # Filtered server-side, so only matching threads are transferred.
+        params["searchTerms"] = search_terms
+    return params
+
+def flatten_comment_thread(thread_item, columns=DEFAULT_COLUMNS):
     s = thread_item["snippet"]
     top = s["topLevelComment"]["snippet"]
+    row = {}
+    for column in columns:
+        if column in COMMENT_FIELDS:
+            row[column] = top.get(COMMENT_FIELDS[column])
+        elif column in THREAD_FIELDS:
+            row[column] = s.get(THREAD_FIELDS[column], 0)
+        else:
+            row[column] = thread_item.get("id")
+    return row
+
+def flatten_comment(comment_item):
+    s = comment_item["snippet"]
     return {
-        "text": top.get("textDisplay"),
-        "published_at": top.get("publishedAt"),
-        "like_count": top.get("likeCount"),
-        "reply_count": s.get("totalReplyCount", 0),
+        "text": s.get("textDisplay"),
+        "published_at": s.get("publishedAt"),
+        "like_count": s.get("likeCount"),
     }
 
-def scrape_comments(api_key, video_url):
+def scrape_comments(api_key, video_url, transport=None, checkpoints=None,
+                    expand_replies=False, reply_workers=DEFAULT_REPLY_WORKERS, columns=DEFAULT_COLUMNS,
+                    limits=None, sample_pages=None, search_terms=None):
+    """Scrape a video's comments and return `(title, comments)`.
+
+    Pass a `ScrapeLimits` to stop early; check `limits.partial` afterwards to
+    see whether the deadline truncated the result. With `sample_pages`, only
+    that many pages of top comments (relevance order) are fetched as a quick
+    preview, without checkpointing. `search_terms` restricts the crawl to
+    threads matching the API's server-side keyword search (also without
+    checkpointing, since the saved pages would not match other queries).
+    """
+    transport = transport or get_default_transport()
     video_id = extract_video_id(video_url)
-    title = get_video_title(api_key, video_id)
-    raw_comments = fetch_all_comment_threads(api_key, video_id)
-    flat_comments = [flatten_comment_thread(c) for c in raw_comments]
+    order = "time"
+    if sample_pages is not None:
+        order = "relevance"
+        checkpoints = None
+    if search_terms:
+        checkpoints = None
+    # The title lookup runs alongside pagination instead of delaying the first page.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        title_future = executor.submit(get_video_title, api_key, video_id, transport)
+        flat_comments = list(iter_comments(api_key, video_id, transport=transport, checkpoints=checkpoints,
+                                           expand_replies=expand_replies, reply_workers=reply_workers,
+                                           columns=columns, limits=limits, order=order,
+                                           max_pages=sample_pages, search_terms=search_terms))
+        title = title_future.result()
+    # A deadline-truncated crawl keeps its checkpoint so it can be resumed.
+    if checkpoints is not None and not (limits is not None and limits.partial):
+        checkpoints.clear(video_id)
     return title, flat_comments
+
+_background_executor = ThreadPoolExecutor(max_workers=2)
+
+def sample_comments(api_key, video_url, pages=DEFAULT_SAMPLE_PAGES, continue_in_background=False,
+                    transport=None, columns=DEFAULT_COLUMNS, **scrape_kwargs):
+    """Quick preview of a video's top comments.
+
+    Returns `(title, comments, full_crawl)`. With `continue_in_background`,
+    `full_crawl` is a Future resolving to the complete `scrape_comments`
+    result; otherwise it is None.
+    """
+    title, comments = scrape_comments(api_key, video_url, transport=transport, sample_pages=pages, columns=columns)
+    full_crawl = None
+    if continue_in_background:
+        full_crawl = _background_executor.submit(scrape_comments, api_key, video_url, transport=transport,
+                                                 columns=columns, **scrape_kwargs)
+    return title, comments, full_crawl
+
+def scrape_comments_incremental(api_key, video_url, store=None, transport=None):
+    """Fetch only comments published since the last run and merge them into
+    the stored result. Returns `(title, comments, new_count)`."""
+    transport = transport or get_default_transport()
+    store = store or WatermarkStore()
+    video_id = extract_video_id(video_url)
+    record = store.load(video_id) or {"title": None, "watermark": None, "comments": []}
+
+    new_threads = list(iter_new_comment_threads(api_key, video_id, record["watermark"], transport=transport))
+    title = record["title"] or get_video_title(api_key, video_id, transport=transport)
+    comments = [flatten_comment_thread(t) for t in new_threads] + record["comments"]
+
+    store.save(video_id, {
+        "video_id": video_id,
+        "title": title,
+        "watermark": advance_watermark(record["watermark"], new_threads),
+        "comments": comments,
+    })
+    return title, comments, len(new_threads)
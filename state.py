@@ -0,0 +1,95 @@
+import json
+import os
+
+DEFAULT_STATE_DIR = ".scrape_state"
+
+def write_json_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def read_json(path, default=None):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+class WatermarkStore:
+    """Per-video record of the newest comment seen plus the merged results.
+
+    The watermark holds the newest `publishedAt` and the ids of the threads
+    published at exactly that instant, so ties are not re-counted.
+    """
+
+    def __init__(self, directory=os.path.join(DEFAULT_STATE_DIR, "watermarks")):
+        self.directory = directory
+
+    def _path(self, video_id):
+        return os.path.join(self.directory, f"{video_id}.json")
+
+    def load(self, video_id):
+        return read_json(self._path(video_id))
+
+    def save(self, video_id, record):
+        os.makedirs(self.directory, exist_ok=True)
+        write_json_atomic(self._path(video_id), record)
+
+class CheckpointStore:
+    """Append-only log of fetched comment pages so an interrupted scrape can
+    resume from the last saved `nextPageToken`.
+
+    Each line holds one page of flattened comments, the token for the page
+    after it and the scrape settings (`config`) that produced it. A truncated
+    final line (crash mid-write) is cut off on load so later appends start on
+    a fresh line, and a log written under different settings is discarded,
+    since its rows would not match the new ones.
+    """
+
+    def __init__(self, directory=os.path.join(DEFAULT_STATE_DIR, "checkpoints")):
+        self.directory = directory
+
+    def _path(self, video_id):
+        return os.path.join(self.directory, f"{video_id}.jsonl")
+
+    def load(self, video_id, config=None):
+        path = self._path(video_id)
+        pages = []
+        next_token = None
+        good_bytes = 0
+        try:
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    if entry.get("config") != config:
+                        self.clear(video_id)
+                        return [], None
+                    pages.append(entry["comments"])
+                    next_token = entry["next_page_token"]
+                    good_bytes += len(line)
+                torn = f.seek(0, os.SEEK_END) > good_bytes
+        except FileNotFoundError:
+            return pages, next_token
+        if torn:
+            os.truncate(path, good_bytes)
+        return pages, next_token
+
+    def append(self, video_id, comments, next_token, config=None):
+        os.makedirs(self.directory, exist_ok=True)
+        entry = {"next_page_token": next_token, "comments": comments, "config": config}
+        with open(self._path(video_id), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def clear(self, video_id):
+        try:
+            os.remove(self._path(video_id))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from async_scraper import AsyncTransport, scrape_comments_async
+from mock_api import MockYouTubeAPI, _timestamp
+from ratelimit import TokenBucket
+from scraper import ScrapeLimits, Transport, scrape_comments, video_url
+from state import CheckpointStore
+
+VIDEO_ID = "resumeVid01"
+COMMENTS = 200
+
+@pytest.fixture
+def api():
+    with MockYouTubeAPI(comments=COMMENTS) as api:
+        yield api
+
+def interrupted_limits():
+    # The deadline has already passed, so the crawl stops after one page and
+    # keeps its checkpoint; that page holds only the threads older than #10.
+    return ScrapeLimits(published_before=_timestamp(10), deadline=0)
+
+def test_resume_with_new_date_window_refetches(api, tmp_path):
+    checkpoints = CheckpointStore(str(tmp_path))
+    transport = Transport(base_url=api.base_url, limiter=TokenBucket(10000, 10000))
+    limits = interrupted_limits()
+    _, first = scrape_comments("key", video_url(VIDEO_ID), transport=transport, checkpoints=checkpoints,
+                               limits=limits)
+    assert limits.partial
+    assert len(first) < COMMENTS
+
+    _, comments = scrape_comments("key", video_url(VIDEO_ID), transport=transport, checkpoints=checkpoints)
+    assert len(comments) == COMMENTS
+    assert len({c["published_at"] for c in comments}) == COMMENTS
+
+def test_async_resume_with_new_date_window_refetches(api, tmp_path):
+    checkpoints = CheckpointStore(str(tmp_path))
+
+    async def scrape(limits=None):
+        async with AsyncTransport(base_url=api.base_url, limiter=TokenBucket(10000, 10000)) as transport:
+            return await scrape_comments_async("key", video_url(VIDEO_ID), transport, checkpoints, limits=limits)
+
+    limits = interrupted_limits()
+    _, first = asyncio.run(scrape(limits))
+    assert limits.partial
+    assert len(first) < COMMENTS
+
+    _, comments = asyncio.run(scrape())
+    assert len(comments) == COMMENTS
+    assert len({c["published_at"] for c in comments}) == COMMENTS
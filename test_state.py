@@ -0,0 +1,20 @@
+from state import CheckpointStore
+
+def test_checkpoint_resumes_past_torn_write(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    store.append("vid", [{"comment_id": "a"}], "T1")
+    with open(store._path("vid"), "a", encoding="utf-8") as f:
+        f.write('{"next_page_token": "T2", "comm')
+
+    assert store.load("vid") == ([[{"comment_id": "a"}]], "T1")
+
+    store.append("vid", [{"comment_id": "b"}], "T2")
+    store.append("vid", [{"comment_id": "c"}], "T3")
+    assert store.load("vid") == ([[{"comment_id": "a"}], [{"comment_id": "b"}], [{"comment_id": "c"}]], "T3")
+
+def test_checkpoint_discarded_when_config_changes(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    store.append("vid", [{"comment_id": "a"}], "T1", config={"order": "time"})
+
+    assert store.load("vid", config={"order": "relevance"}) == ([], None)
+    assert store.load("vid", config={"order": "time"}) == ([], None)